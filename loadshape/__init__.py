@@ -41,6 +41,15 @@ __license__ = 'revised BSD'
 # from .loadshape import *
 
 import utils
+import weather
+import scheduler
+import calendar_features
+import bootstrap
 from loadshape import Loadshape
 from series import Series
+from seriesframe import SeriesFrame
+from timegrid import TimeGrid
+from resultcache import ResultCache
 from tariff import Tariff
+from online import OnlineBaseline
+from store import MeterStore
@@ -0,0 +1,426 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+"""durable job queue for running many meters, ex: a portfolio re-baseline
+
+    loadshape-batch add jobs.db --store meters.db --kind baseline --all-meters
+    loadshape-batch work jobs.db --store meters.db --timezone America/Los_Angeles --processes 8
+    loadshape-batch status jobs.db
+    loadshape-batch results jobs.db > results.jsonl
+
+Each job is one meter and one request: baseline, diff or event_performance.
+Jobs, results and errors live in a sqlite database, and readings are read from
+a MeterStore. Any number of workers, in one process group or on several hosts
+that share the database file, claim jobs one at a time; a claim is a lease,
+so the jobs of a worker that dies are picked up again once the lease runs
+out, and restarting the workers resumes only the unfinished jobs. A worker
+renews its lease every third of --lease-seconds while a job runs, so jobs
+that run longer than the lease are not claimed by a second worker.
+
+The params of a job (a JSON object) may hold start_at and end_at (for diff and
+event_performance), a "baseline" object with the baseline arguments
+(weighting_days, modeling_interval, step_size, start_at, end_at), temp_meter
+(the store id of the temperature readings) and sq_ft.
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import argparse
+import threading
+import traceback
+import multiprocessing
+import scheduler
+
+from loadshape import Loadshape
+from store import MeterStore
+from resultcache import ResultCache
+
+KINDS = ['baseline', 'diff', 'event_performance']
+
+BASELINE_ARGS = ['start_at', 'end_at', 'weighting_days', 'modeling_interval',
+                 'step_size']
+
+class JobQueue(object):
+
+    def __init__(self, filename, lease_seconds=6 * 3600):
+        """sqlite table of jobs
+        - a job is pending, running (claimed, with a lease), done or failed
+        - claims take sqlite's write lock (BEGIN IMMEDIATE), so two workers
+        never claim the same job, in one process or across hosts
+        - running jobs whose lease has expired may be claimed again
+        """
+        self.filename       = filename
+        self.lease_seconds  = lease_seconds
+
+        self.connection = sqlite3.connect(filename, timeout=60, isolation_level=None)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                                       id           INTEGER PRIMARY KEY,
+                                       meter_id     TEXT NOT NULL,
+                                       kind         TEXT NOT NULL,
+                                       params       TEXT NOT NULL,
+                                       status       TEXT NOT NULL DEFAULT 'pending',
+                                       worker       TEXT,
+                                       attempts     INTEGER NOT NULL DEFAULT 0,
+                                       lease_until  REAL,
+                                       finished_at  REAL,
+                                       result       TEXT,
+                                       error        TEXT,
+                                       UNIQUE (meter_id, kind, params)
+                                   )""")
+        self.connection.execute("""CREATE INDEX IF NOT EXISTS jobs_status
+                                   ON jobs (status, id)""")
+
+    # --- adding jobs --- #
+    def add(self, meter_id, kind, params=None):
+        """add a job; adding a job that already exists (same meter, kind and
+        params) does nothing, so a portfolio can be added again after a crash
+        - returns True if the job is new
+        """
+        return self.add_many([meter_id], kind, params) == 1
+
+    def add_many(self, meter_ids, kind, params=None):
+        """add the same request for several meters, returns the number of new jobs"""
+        if kind not in KINDS: raise Exception("unknown job kind: %s" % kind)
+        params = json.dumps(params or {}, sort_keys=True)
+
+        return self._write("INSERT OR IGNORE INTO jobs (meter_id, kind, params) VALUES (?, ?, ?)",
+                           [(str(m), kind, params) for m in meter_ids], many=True)
+
+    # --- claiming and finishing --- #
+    def claim(self, worker):
+        """claim the next pending job (or a running job whose lease has
+        expired) for worker; returns (id, meter_id, kind, params) or None
+        """
+        now = time.time()
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            row = cursor.execute("""SELECT id, meter_id, kind, params FROM jobs
+                                    WHERE status = 'pending'
+                                       OR (status = 'running' AND lease_until < ?)
+                                    ORDER BY id LIMIT 1""", (now,)).fetchone()
+            if row != None:
+                cursor.execute("""UPDATE jobs SET status = 'running', worker = ?,
+                                      attempts = attempts + 1, lease_until = ?
+                                  WHERE id = ?""", (worker, now + self.lease_seconds, row[0]))
+            cursor.execute("COMMIT")
+        except:
+            cursor.execute("ROLLBACK")
+            raise
+
+        if row == None: return None
+        return row[0], row[1], row[2], json.loads(row[3])
+
+    def renew(self, job_id, worker):
+        """extend a running job's lease; returns False if the job is no longer
+        running for worker
+        """
+        changed = self._write("""UPDATE jobs SET lease_until = ?
+                                 WHERE id = ? AND worker = ? AND status = 'running'""",
+                              (time.time() + self.lease_seconds, job_id, worker))
+        return changed == 1
+
+    def complete(self, job_id, worker, result):
+        """store a job's result; returns False if the job's lease had passed to
+        another worker
+        """
+        return self._finish(job_id, worker, 'done', json.dumps(result), None)
+
+    def fail(self, job_id, worker, error):
+        return self._finish(job_id, worker, 'failed', None, error)
+
+    def _finish(self, job_id, worker, status, result, error):
+        changed = self._write("""UPDATE jobs SET status = ?, result = ?, error = ?,
+                                     finished_at = ?, lease_until = NULL
+                                 WHERE id = ? AND worker = ? AND status = 'running'""",
+                              (status, result, error, time.time(), job_id, worker))
+        return changed == 1
+
+    def retry_failed(self, kind=None):
+        """return failed jobs to the queue, returns the number of jobs"""
+        sql = "UPDATE jobs SET status = 'pending', error = NULL WHERE status = 'failed'"
+        params = ()
+        if kind != None:
+            sql += " AND kind = ?"
+            params = (kind,)
+        return self._write(sql, params)
+
+    # --- reporting --- #
+    def counts(self):
+        """number of jobs in each status; running jobs whose lease has expired
+        are counted as stale
+        """
+        counts = dict((status, 0) for status in ['pending', 'running', 'stale', 'done', 'failed'])
+        rows = self.connection.execute("""SELECT CASE WHEN status = 'running' AND lease_until < ?
+                                                      THEN 'stale' ELSE status END, COUNT(*)
+                                          FROM jobs GROUP BY 1""", (time.time(),))
+        for status, count in rows: counts[status] = count
+        return counts
+
+    def results(self, kind=None, status='done'):
+        """(meter_id, kind, params, result or error) for finished jobs"""
+        sql = "SELECT meter_id, kind, params, result, error FROM jobs WHERE status = ?"
+        params = [status]
+        if kind != None:
+            sql += " AND kind = ?"
+            params.append(kind)
+
+        for meter_id, kind, job_params, result, error in \
+                self.connection.execute(sql + " ORDER BY id", params):
+            yield meter_id, kind, json.loads(job_params), \
+                  json.loads(result) if result != None else error
+
+    def close(self):
+        self.connection.close()
+
+    def _write(self, sql, params, many=False):
+        """run one write in its own transaction, returns the number of rows changed"""
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if many: cursor.executemany(sql, params)
+            else: cursor.execute(sql, params)
+            changed = cursor.rowcount
+            cursor.execute("COMMIT")
+        except:
+            cursor.execute("ROLLBACK")
+            raise
+        return changed
+
+class Worker(object):
+
+    def __init__(self, queue, store, timezone=None, temp_units='F', result_cache=None,
+                 log_level=logging.INFO):
+        """claims jobs from a JobQueue and runs them against a MeterStore"""
+        logging.basicConfig(level=log_level)
+        self.logger         = logging.getLogger(__name__)
+        self.log_level      = log_level
+        self.queue          = queue
+        self.store          = store
+        self.timezone       = timezone
+        self.temp_units     = temp_units
+        self.result_cache   = result_cache
+        self.name           = "%s:%s" % (socket.gethostname(), os.getpid())
+
+    def run(self, max_jobs=None):
+        """run jobs until the queue is empty (or max_jobs have run), returns the
+        number of jobs run
+        """
+        count = 0
+        while (max_jobs == None) or (count < max_jobs):
+            job = self.queue.claim(self.name)
+            if job == None: break
+            self.run_job(*job)
+            count += 1
+        return count
+
+    def run_job(self, job_id, meter_id, kind, params):
+        started_at = time.time()
+        stop_heartbeat = self._heartbeat(job_id)
+        try:
+            result = self.compute(meter_id, kind, params)
+        except Exception:
+            stop_heartbeat()
+            self.logger.error("job %s (%s %s) failed" % (job_id, kind, meter_id))
+            self.queue.fail(job_id, self.name, traceback.format_exc())
+            return False
+
+        stop_heartbeat()
+        if not self.queue.complete(job_id, self.name, result):
+            self.logger.warn("job %s finished after its lease expired" % job_id)
+        self.logger.info("job %s (%s %s) done in %.1fs" % (job_id, kind, meter_id,
+                                                           time.time() - started_at))
+        return True
+
+    def _heartbeat(self, job_id):
+        """renew the job's lease every third of the lease from a background
+        thread while it runs; returns a function that stops the renewals
+        """
+        stop = threading.Event()
+
+        def run():
+            # sqlite connections belong to the thread that opened them
+            queue = JobQueue(self.queue.filename, self.queue.lease_seconds)
+            try:
+                while not stop.wait(self.queue.lease_seconds / 3.0):
+                    if not queue.renew(job_id, self.name):
+                        self.logger.warn("job %s lost its lease" % job_id)
+                        break
+            finally:
+                queue.close()
+
+        thread = threading.Thread(target=run, name="lease-%s" % job_id)
+        thread.daemon = True
+        thread.start()
+
+        def stop_renewing():
+            stop.set()
+            thread.join()
+        return stop_renewing
+
+    def compute(self, meter_id, kind, params):
+        loadshape = self.loadshape(meter_id, params)
+        baseline_args = dict((str(k), v) for k, v in params.get('baseline', {}).iteritems()
+                             if k in BASELINE_ARGS)
+        start_at, end_at = params.get('start_at'), params.get('end_at')
+
+        baseline_series = loadshape.baseline(**baseline_args)
+        if len(baseline_series.values()) == 0:
+            raise Exception("the baseline model produced no output for meter: %s" % meter_id)
+
+        if kind == 'baseline':
+            return {"baseline": baseline_series.data(), "error_stats": loadshape.error_stats}
+        if kind == 'diff':
+            diff = loadshape.diff(start_at, end_at,
+                                  step_size=params.get('step_size', 900))
+            return dict((name, series.data()) for name, series in diff.items())
+        if kind == 'event_performance':
+            return loadshape.event_performance(start_at, end_at)
+
+        raise Exception("unknown job kind: %s" % kind)
+
+    def loadshape(self, meter_id, params):
+        load = self.store.series(meter_id)
+        if len(load.values()) == 0: raise Exception("no readings for meter: %s" % meter_id)
+
+        temp = None
+        if params.get('temp_meter') != None:
+            temp = self.store.series(params['temp_meter'], temp_units=self.temp_units)
+
+        return Loadshape(load, temp, timezone=self.timezone, temp_units=self.temp_units,
+                         sq_ft=params.get('sq_ft'), log_level=self.log_level,
+                         result_cache=self.result_cache)
+
+def work(queue_file, store_file, timezone=None, temp_units='F', result_cache_dir=None,
+         lease_seconds=6 * 3600, max_jobs=None, log_level=logging.INFO):
+    """run one worker until the queue is empty (the target of --processes)"""
+    result_cache = None
+    if result_cache_dir != None: result_cache = ResultCache(result_cache_dir)
+
+    queue = JobQueue(queue_file, lease_seconds)
+    with MeterStore(store_file, timezone) as store:
+        try:
+            return Worker(queue, store, timezone, temp_units, result_cache,
+                          log_level).run(max_jobs)
+        finally:
+            queue.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="loadshape batch job queue")
+    commands = parser.add_subparsers(dest="command")
+
+    add = commands.add_parser("add", help="add jobs")
+    add.add_argument("queue")
+    add.add_argument("--kind", choices=KINDS, default="baseline")
+    add.add_argument("--meter", dest="meters", action="append", default=[])
+    add.add_argument("--all-meters", action="store_true",
+                     help="add a job for every meter in --store")
+    add.add_argument("--store", default=None)
+    add.add_argument("--params", default="{}", help="job params as a JSON object")
+
+    work_parser = commands.add_parser("work", help="run jobs until the queue is empty")
+    work_parser.add_argument("queue")
+    work_parser.add_argument("--store", required=True)
+    work_parser.add_argument("--timezone", default=None)
+    work_parser.add_argument("--temp-units", default="F")
+    work_parser.add_argument("--processes", type=int, default=1)
+    work_parser.add_argument("--lease-seconds", type=float, default=6 * 3600,
+                             help="seconds before the job of a worker that stopped renewing "
+                                  "its claim may be claimed again")
+    work_parser.add_argument("--result-cache", default=None,
+                             help="directory of a ResultCache shared by the workers")
+    work_parser.add_argument("--max-r-processes", type=int, default=None,
+                             help="R scripts each worker may run at once")
+    work_parser.add_argument("--r-timeout", type=float, default=None,
+                             help="seconds before a running R script is killed")
+    work_parser.add_argument("--log-level", default="INFO")
+
+    status = commands.add_parser("status", help="count jobs by status")
+    status.add_argument("queue")
+
+    results = commands.add_parser("results", help="print results as JSON lines")
+    results.add_argument("queue")
+    results.add_argument("--kind", choices=KINDS, default=None)
+    results.add_argument("--failed", action="store_true", help="print errors instead")
+
+    retry = commands.add_parser("retry", help="return failed jobs to the queue")
+    retry.add_argument("queue")
+    retry.add_argument("--kind", choices=KINDS, default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        meters = list(args.meters)
+        if args.all_meters:
+            if args.store == None: parser.error("--all-meters requires --store")
+            with MeterStore(args.store) as store: meters += store.meter_ids()
+        queue = JobQueue(args.queue)
+        print "added %s jobs" % queue.add_many(meters, args.kind, json.loads(args.params))
+
+    elif args.command == "work":
+        if args.max_r_processes: scheduler.configure(max_processes=args.max_r_processes)
+        if args.r_timeout: scheduler.configure(timeout=args.r_timeout)
+
+        work_args = (args.queue, args.store, args.timezone, args.temp_units,
+                     args.result_cache, args.lease_seconds, None,
+                     getattr(logging, args.log_level.upper()))
+        if args.processes > 1:
+            pool = multiprocessing.Pool(args.processes)
+            counts = [pool.apply_async(work, work_args) for i in range(args.processes)]
+            pool.close()
+            pool.join()
+            print "ran %s jobs" % sum(c.get() for c in counts)
+        else:
+            print "ran %s jobs" % work(*work_args)
+
+    elif args.command == "status":
+        counts = JobQueue(args.queue).counts()
+        for status in ['pending', 'running', 'stale', 'done', 'failed']:
+            print "%-8s %s" % (status, counts[status])
+
+    elif args.command == "results":
+        status = 'failed' if args.failed else 'done'
+        for meter_id, kind, params, result in JobQueue(args.queue).results(args.kind, status):
+            key = 'error' if args.failed else 'result'
+            print json.dumps({"meter_id": meter_id, "kind": kind, "params": params, key: result})
+
+    elif args.command == "retry":
+        print "requeued %s jobs" % JobQueue(args.queue).retry_failed(args.kind)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import numpy
+
+import calendar_features
+
+from online import TEMPERATURE_KNOTS_F
+
+class BaselineBootstrap(object):
+
+    def __init__(self, timezone, interval_minutes=15, weighting_days=14,
+                 temp_units='F', block_days=1):
+        """block bootstrap of the time-of-week and temperature baseline model
+        - the regression is fit once to the training data; replicates resample
+        whole days of its residuals (block_days consecutive days at a time, so
+        day-to-day correlation is kept) and add them back to the fitted values
+        - the model is linear in the load, so every replicate's coefficients
+        are the fitted coefficients plus one fixed (parameters x observations)
+        matrix times its residuals: all of the replicates are refit together,
+        with a matrix product instead of a solve per replicate, and memory
+        grows with the data length rather than its square
+        - observations are weighted by time from the middle of the prediction
+        period, with the Cauchy weighting used by baseline.R
+        - the design is that of fitLBNLregress in baseline.R without the
+        occupied / unoccupied split
+        """
+        self.timezone           = timezone
+        self.interval_minutes   = interval_minutes
+        self.weighting_days     = weighting_days
+        self.temp_units         = temp_units.upper()
+        self.block_days         = block_days
+
+        self.n_intervals = int(numpy.ceil(7 * 24 * 60 / float(interval_minutes)))
+        self.temp_knots = [(k - 32) * 5.0 / 9 for k in TEMPERATURE_KNOTS_F]
+
+    def fit(self, times, kw, prediction_times, temps=None, prediction_temps=None):
+        """fit the model to the training data and prepare the predictions for
+        prediction_times
+        - temps (and prediction_temps) must line up with times (and
+        prediction_times); without them the model has no temperature terms
+        """
+        times = numpy.asarray(times, dtype=numpy.int64)
+        kw = numpy.asarray(kw, dtype=numpy.float64)
+        prediction_times = numpy.asarray(prediction_times, dtype=numpy.int64)
+
+        keep = ~numpy.isnan(kw)
+        if temps is not None: keep &= ~numpy.isnan(temps)
+        times, kw = times[keep], kw[keep]
+        if temps is not None: temps = numpy.asarray(temps, dtype=numpy.float64)[keep]
+        if len(times) == 0: raise Exception("no training data to bootstrap")
+
+        X = self.design(times, temps)
+        X_pred = self.design(prediction_times, prediction_temps)
+
+        center = (prediction_times.min() + prediction_times.max()) / 2.0
+        days_away = (times - center) / 86400.0
+        weights = 1.0 / (1.0 + (days_away / self.weighting_days) ** 2)
+
+        # coefficients = solve * kw, for the observed kw and for every replicate
+        XtW = X.T * weights
+        self.solve = numpy.dot(numpy.linalg.pinv(numpy.dot(XtW, X)), XtW)
+        self.X_pred = X_pred
+        coefficients = numpy.dot(self.solve, kw)
+        self.predictions = numpy.dot(X_pred, coefficients)
+
+        self._residual_days(times, kw - numpy.dot(X, coefficients))
+        return self
+
+    def deviations(self, replicates=200, seed=None, chunk_size=100):
+        """replicate predictions minus the fitted predictions, one column per
+        replicate (computed chunk_size replicates at a time)
+        """
+        random = numpy.random.RandomState(seed)
+        out = numpy.empty((len(self.predictions), replicates))
+
+        for first in range(0, replicates, chunk_size):
+            count = min(chunk_size, replicates - first)
+            errors = self._resample(random, count)
+            out[:, first:first + count] = numpy.dot(self.X_pred, numpy.dot(self.solve, errors.T))
+
+        return out
+
+    # --- design --- #
+    def design(self, times, temps=None):
+        """design matrix: one indicator per time-of-week interval, plus the
+        piecewise-linear temperature variables if temps are provided
+        """
+        intervals = calendar_features.features(times, self.timezone) \
+                                     .interval_of_week(self.interval_minutes)
+        n_temp = 0 if temps is None else len(self.temp_knots) + 1
+
+        X = numpy.zeros((len(times), self.n_intervals + n_temp))
+        X[numpy.arange(len(times)), intervals] = 1.0
+        if n_temp: X[:, self.n_intervals:] = self.temperature_variables(temps)
+        return X
+
+    def temperature_variables(self, temps):
+        """vectorized OnlineBaseline.temperature_variables"""
+        temps = numpy.asarray(temps, dtype=numpy.float64)
+        if self.temp_units == 'F': temps = (temps - 32) * 5.0 / 9
+
+        bounds = self.temp_knots + [1000000]
+        out = numpy.empty((len(temps), len(bounds)))
+        out[:, 0] = numpy.minimum(temps, bounds[0])
+        for i in range(1, len(bounds)):
+            out[:, i] = numpy.clip(temps - bounds[i - 1], 0, bounds[i] - bounds[i - 1])
+        return out
+
+    # --- residual days --- #
+    def _residual_days(self, times, residuals):
+        """residuals as a (day, time of day) table; slots without an
+        observation are 0, i.e. not perturbed
+        - slots count elapsed time since local midnight, not the wall clock,
+        so the repeated hour of a daylight saving day gets slots of its own
+        """
+        features = calendar_features.features(times, self.timezone)
+        step = int(numpy.median(numpy.diff(times))) if len(times) > 1 else 900
+        step = max(step, 60)
+
+        # unix time of each reading's local midnight, at the offset in effect then
+        midnight = features.days * 86400
+        midnight -= calendar_features.utc_offsets(
+            midnight - calendar_features.utc_offsets(times, self.timezone), self.timezone)
+
+        self.day_index = features.days - features.days.min()
+        self.slot_index = (times - midnight) // step
+
+        self.n_days = int(self.day_index.max()) + 1
+        self.residual_table = numpy.zeros((self.n_days, int(25 * 3600 // step) + 1))
+        self.residual_table[self.day_index, self.slot_index] = residuals
+
+    def _resample(self, random, count):
+        """count replicates of the residuals, drawn block_days days at a time"""
+        block = min(self.block_days, self.n_days)
+        n_blocks = int(numpy.ceil(self.n_days / float(block)))
+
+        starts = random.randint(0, self.n_days - block + 1, size=(count, n_blocks))
+        days = numpy.arange(self.n_days)
+        source = starts[:, days // block] + (days % block)
+
+        return self.residual_table[source[:, self.day_index], self.slot_index]
+
+def percentile_band(deviations, confidence=0.9, axis=-1):
+    """lower and upper percentiles of bootstrap deviations for a central
+    interval with the given coverage
+    """
+    tail = 50.0 - (confidence * 50)
+    return (numpy.percentile(deviations, tail, axis=axis),
+            numpy.percentile(deviations, 100 - tail, axis=axis))
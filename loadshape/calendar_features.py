@@ -0,0 +1,137 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import numpy
+import hashlib
+import datetime
+import threading
+
+import exclusions
+
+from collections import OrderedDict
+
+class CalendarFeatures(object):
+
+    def __init__(self, times, timezone, holidays=None):
+        """calendar fields of an array of unix timestamps, in local time for
+        the timezone; fields follow R's POSIXlt so they line up with the R scripts
+        - weekday:          0 (Sunday) to 6 (Saturday), as POSIXlt$wday
+        - month:            1 to 12
+        - hour, minute:     local wall clock hour and minute
+        - minute_of_week:   minutes since Sunday midnight
+        - weekend:          Saturday or Sunday
+        - holiday:          the local date is one of the holidays (YYYY-MM-DD
+        strings, default: the US holidays in exclusions.py)
+        - daytime:          8AM to 6PM, as in the goodness of fit statistics
+        - hour_index:       local hours since the epoch (groups intervals by hour)
+        """
+        if holidays == None: holidays = exclusions.US_HOLIDAYS.values()
+
+        self.times = numpy.asarray(times, dtype=numpy.int64)
+        local = self.times + utc_offsets(self.times, timezone)
+
+        days = local // 86400
+        seconds = local - (days * 86400)
+        dates = days.astype('datetime64[D]')
+
+        self.days           = days
+        self.hour           = seconds // 3600
+        self.minute         = (seconds % 3600) // 60
+        self.weekday        = (days + 4) % 7  # 1970-01-01 was a Thursday
+        self.month          = (dates.astype('datetime64[M]').astype(numpy.int64) % 12) + 1
+        self.minute_of_week = (self.weekday * 1440) + (self.hour * 60) + self.minute
+        self.weekend        = (self.weekday == 0) | (self.weekday == 6)
+        self.daytime        = (self.hour > 7) & (self.hour < 19)
+        self.hour_index     = (days * 24) + self.hour
+
+        holiday_days = numpy.array(sorted(holidays), dtype='datetime64[D]').astype(numpy.int64)
+        self.holiday = numpy.in1d(days, holiday_days)
+
+    def interval_of_week(self, interval_minutes=15):
+        """0-based time-of-week intervals (intervalOfWeek - 1 in baseline.R)"""
+        return self.minute_of_week // int(interval_minutes)
+
+    def workday(self):
+        """neither a weekend day nor a holiday"""
+        return ~(self.weekend | self.holiday)
+
+def utc_offsets(times, timezone):
+    """utc offset (seconds) of each timestamp, from the timezone's transition
+    times (offsets do not only change on the hour, ex: America/St_Johns)
+    """
+    times = numpy.asarray(times, dtype=numpy.int64)
+    if len(times) == 0: return numpy.zeros(0, dtype=numpy.int64)
+
+    transitions = getattr(timezone, '_utc_transition_times', None)
+    if transitions == None:
+        # fixed offset zones
+        local = datetime.datetime.fromtimestamp(int(times[0]), timezone)
+        return numpy.repeat(int(local.utcoffset().total_seconds()), len(times))
+
+    starts = numpy.array(transitions, dtype='datetime64[s]').astype(numpy.int64)
+    offsets = numpy.array([int(info[0].total_seconds()) for info in timezone._transition_info],
+                          dtype=numpy.int64)
+    index = numpy.searchsorted(starts, times, side='right') - 1
+    return offsets[numpy.maximum(index, 0)]
+
+# --- memoized features --- #
+# timestamp grids are shared by baseline, diff and cost calls (and by buildings
+# on the same grid), so features are computed once per (grid, timezone, holidays)
+max_entries = 64
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def features(times, timezone, holidays=None):
+    """CalendarFeatures for the timestamps, reused across calls"""
+    times = numpy.asarray(times, dtype=numpy.int64)
+    key = (hashlib.sha1(times.tobytes()).hexdigest(), len(times), str(timezone),
+           tuple(sorted(holidays)) if holidays != None else None)
+
+    with _lock:
+        if key in _cache:
+            found = _cache.pop(key)
+            _cache[key] = found
+            return found
+
+    found = CalendarFeatures(times, timezone, holidays)
+    with _lock:
+        _cache[key] = found
+        while len(_cache) > max_entries: _cache.popitem(last=False)
+    return found
+
+def clear():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,256 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import numpy
+import utils
+import datetime
+
+# seconds per unit for arrow timestamp types
+TIMESTAMP_UNITS = {'s': 1, 'ms': 10**3, 'us': 10**6, 'ns': 10**9}
+
+def import_pyarrow():
+    """pyarrow is an optional dependency, only needed for Arrow / Parquet IO"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception("pyarrow is required for Arrow / Parquet support")
+    return pyarrow
+
+def import_pandas():
+    """pandas is an optional dependency, only imported for pandas conversions"""
+    try:
+        import pandas
+    except ImportError:
+        raise Exception("pandas is required for pandas support")
+    return pandas
+
+# --- readers --- #
+def read_pandas(data, value_column=None, timestamp_column=None, timezone=None):
+    """timestamps (unix seconds) and values (float) from a pandas Series or
+    DataFrame
+    - timestamps come from timestamp_column if given, otherwise from the index;
+    they may be datetimes (tz aware, or local wall clock time in timezone) or
+    integer unix seconds / milliseconds
+    - a DataFrame needs a value_column unless it has a single column
+    - float64 values are used as they are, without a copy
+    """
+    pd = import_pandas()
+    if isinstance(data, pd.DataFrame):
+        if value_column == None:
+            value_columns = [c for c in data.columns if c != timestamp_column]
+            if len(value_columns) != 1:
+                raise Exception("value_column is required for a DataFrame with several columns")
+            value_column = value_columns[0]
+        values = data[value_column]
+    else:
+        values = data
+
+    stamps = data.index if timestamp_column == None else data[timestamp_column]
+    times = _pandas_seconds(stamps, timezone, pd)
+    return times, numpy.asarray(values.values, dtype=numpy.float64)
+
+def read_arrow(table, timestamp_column='timestamp', value_column='value',
+               timezone=None, start_at=None, end_at=None):
+    """timestamps (unix seconds) and values (float) from an arrow table
+    - timestamp columns may be arrow timestamps (tz aware or local wall clock
+    time), or integer unix seconds / milliseconds
+    - rows outside of start_at / end_at are dropped
+    """
+    pa = import_pyarrow()
+    times = _timestamp_seconds(table.column(timestamp_column), timezone, pa)
+    values = _float_values(table.column(value_column), pa)
+
+    if (start_at != None) | (end_at != None):
+        keep = numpy.ones(len(times), dtype=bool)
+        if start_at != None: keep &= times >= utils.read_timestamp(start_at, timezone)
+        if end_at != None: keep &= times <= utils.read_timestamp(end_at, timezone)
+        times, values = times[keep], values[keep]
+
+    return times, values
+
+def read_parquet(filename, timestamp_column='timestamp', value_column='value',
+                 timezone=None, start_at=None, end_at=None):
+    """read a timestamp and value column from a parquet file
+    - only the two requested columns are read
+    - row groups whose timestamp statistics fall outside of start_at / end_at
+    are skipped without being read
+    """
+    pa = import_pyarrow()
+    parquet_file = pa.parquet.ParquetFile(filename)
+
+    start = utils.read_timestamp(start_at, timezone) if start_at != None else None
+    end = utils.read_timestamp(end_at, timezone) if end_at != None else None
+
+    columns = [timestamp_column, value_column]
+    row_groups = _row_groups_in_range(parquet_file, timestamp_column, start, end)
+    if len(row_groups) == parquet_file.metadata.num_row_groups:
+        table = parquet_file.read(columns=columns)
+    else:
+        table = parquet_file.read_row_groups(row_groups, columns=columns)
+
+    return read_arrow(table, timestamp_column, value_column, timezone, start, end)
+
+# --- writers --- #
+def to_arrow(columns, timezone):
+    """build an arrow table from a list of (name, Series) pairs
+    - the output has one row per distinct timestamp and one float column per
+    series; series that have no value at a timestamp are null there
+    """
+    pa = import_pyarrow()
+
+    all_times = [series.arrays()[0] for name, series in columns]
+    times = numpy.unique(numpy.concatenate(all_times)) if all_times else numpy.zeros(0, dtype=numpy.int64)
+
+    arrays = [pa.array(times, type=pa.timestamp('s', tz=timezone.zone))]
+    names = ['timestamp']
+    for name, series in columns:
+        series_times, series_values = series.arrays()
+        out = numpy.full(len(times), numpy.nan)
+        out[numpy.searchsorted(times, series_times)] = series_values
+        arrays.append(pa.array(out, from_pandas=True))
+        names.append(name)
+
+    return pa.Table.from_arrays(arrays, names=names)
+
+def to_pandas_index(times, timezone):
+    """tz aware pandas DatetimeIndex for unix seconds"""
+    pd = import_pandas()
+    nanoseconds = numpy.asarray(times, dtype=numpy.int64) * 10**9
+    return pd.DatetimeIndex(nanoseconds.view('datetime64[ns]'), tz='UTC') \
+             .tz_convert(timezone.zone)
+
+def read_only(array):
+    """read-only view of array, for sharing a series' buffer with pandas"""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+def write_parquet(filename, columns, timezone, **kwargs):
+    """write a list of (name, Series) pairs to a single parquet file; extra
+    keyword arguments are passed to pyarrow.parquet.write_table
+    """
+    pa = import_pyarrow()
+    pa.parquet.write_table(to_arrow(columns, timezone), filename, **kwargs)
+    return filename
+
+# --- helpers --- #
+def _timestamp_seconds(column, timezone, pa):
+    """unix seconds for an arrow timestamp or integer column"""
+    column_type = column.type
+    if pa.types.is_timestamp(column_type):
+        raw = _int_values(column, pa)
+        seconds = raw // TIMESTAMP_UNITS[column_type.unit]
+        if column_type.tz == None: seconds = _localize(seconds, timezone)
+        return seconds
+
+    raw = _int_values(column, pa)
+    if len(raw) and (raw.max() > 9999999999): raw = raw // 1000
+    return raw
+
+def _pandas_seconds(stamps, timezone, pd):
+    """unix seconds for a pandas DatetimeIndex, datetime column or integer
+    index / column
+    """
+    if isinstance(stamps, pd.Series): stamps = pd.Index(stamps)
+    if isinstance(stamps, pd.DatetimeIndex):
+        if stamps.tz == None:
+            return _localize(stamps.asi8 // 10**9, timezone)
+        return stamps.asi8 // 10**9
+
+    raw = numpy.asarray(stamps, dtype=numpy.int64)
+    if len(raw) and (raw.max() > 9999999999): raw = raw // 1000
+    return raw
+
+def _int_values(column, pa):
+    chunks = column.chunks if hasattr(column, 'chunks') else [column]
+    out = [numpy.asarray(c.cast(pa.int64())) for c in chunks]
+    return numpy.concatenate(out).astype(numpy.int64) if out else numpy.zeros(0, dtype=numpy.int64)
+
+def _float_values(column, pa):
+    """float values, nulls become nan"""
+    chunks = column.chunks if hasattr(column, 'chunks') else [column]
+    out = [c.cast(pa.float64()).to_numpy(zero_copy_only=False) for c in chunks]
+    return numpy.concatenate(out).astype(numpy.float64) if out else numpy.zeros(0, dtype=numpy.float64)
+
+def _localize(wall_seconds, timezone):
+    """convert local wall clock seconds to unix seconds; the utc offset is
+    looked up once per distinct local hour
+    """
+    hours, index = numpy.unique(wall_seconds // 3600, return_inverse=True)
+    offsets = numpy.zeros(len(hours), dtype=numpy.int64)
+    for i, hour in enumerate(hours):
+        wall = datetime.datetime.utcfromtimestamp(int(hour) * 3600)
+        offsets[i] = int(timezone.localize(wall).utcoffset().total_seconds())
+    return wall_seconds - offsets[index]
+
+def _row_groups_in_range(parquet_file, timestamp_column, start, end):
+    """row groups that may contain timestamps between start and end"""
+    metadata = parquet_file.metadata
+    row_groups = range(metadata.num_row_groups)
+    if (start == None) & (end == None): return row_groups
+
+    selected = []
+    for i in row_groups:
+        row_group = metadata.row_group(i)
+        stats = None
+        for j in range(row_group.num_columns):
+            column = row_group.column(j)
+            if column.path_in_schema == timestamp_column: stats = column.statistics
+
+        if (stats is None) or (not stats.has_min_max):
+            selected.append(i)
+            continue
+
+        low, high, margin = _stat_seconds(stats.min), _stat_seconds(stats.max), 0
+        if (low == None) | (high == None):
+            selected.append(i)
+            continue
+        # local wall clock statistics may be off by up to a day's worth of utc offset
+        if isinstance(stats.min, datetime.datetime) and stats.min.tzinfo == None: margin = 86400
+
+        if (start != None) and (high + margin < start): continue
+        if (end != None) and (low - margin > end): continue
+        selected.append(i)
+
+    return selected
+
+def _stat_seconds(value):
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo == None: value = value.replace(tzinfo=utils.get_timezone('UTC'))
+        return utils.datetime_to_int(value)
+    try: value = int(value)
+    except (TypeError, ValueError): return None
+    return value // 1000 if value > 9999999999 else value
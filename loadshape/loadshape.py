@@ -35,23 +35,71 @@
 
 import csv
 import utils
+import datetime
+import numpy
+import weather
+import columnar
+import bootstrap
+import hashlib
 import tempfile
 import logging
-
-from os import path
-from series import Series
+import threading
+
+from os import path, makedirs
+from collections import OrderedDict
+from series import Series, read_csv_columns
+from seriesframe import SeriesFrame
+from timegrid import TimeGrid
+from resultcache import ResultCache
+from scheduler import default_scheduler
 from tariff import Tariff
-from subprocess import Popen, PIPE
+
+# sha1 of each model script, so that cached results are not reused across
+# changes to the models
+_script_digests = {}
 
 class Loadshape(object):
     
     def __init__(self, load_data, temp_data=None, forecast_temp_data=None,
                  timezone=None, temp_units='F', sq_ft=None,
-                 tariff=None, log_level=logging.INFO):
+                 tariff=None, log_level=logging.INFO, cache_dir=None,
+                 weather_station=None, weather_source='default', scheduler=None,
+                 result_cache=None):
         """load_data, temp_data, and forecast_temp_data may be:
                 - List of Tuples containing timestamps and values
                 - filename of a csv containing timestamps and values
                 - Series object
+
+        if a cache_dir is provided, model artifacts that depend only on the
+        input data (ex: the occupied/unoccupied time-of-week map) are stored
+        there and reused by later baseline calls and by other processes
+
+        if a weather_station is provided instead of temp_data, the station's
+        temperatures are taken from the process-wide weather registry (see
+        weather.register), so that buildings that share a station share one
+        parsed and interpolated copy of its data
+
+        model scripts are run through a Scheduler (see scheduler.py) that limits
+        how many run at once and how long and how much memory each may use; the
+        process-wide default_scheduler is used unless one is provided
+
+        if a result_cache (see resultcache.py) is provided, the outputs of
+        baseline, diff and cost are stored in it, keyed by a hash of the input
+        series, exclusions, tariff, parameters and model script; repeating a
+        calculation whose inputs have not changed reads the stored outputs
+        instead of running the model
+
+        thread safety: one Loadshape may be used from many threads at once
+        - each call writes its own temporary files and captures the output of
+        its own R run (logged through the loadshape logger, never printed)
+        - baseline() replaces baseline_series and error_stats together, under
+        a lock, once its run has finished; diff, cost and event_performance
+        read the baseline once at the start of the call, so a concurrent
+        refit does not mix two baselines within one result
+        - the input series must not be changed (append, add_exclusion, ...)
+        while calculations are running
+        - log_level is passed to logging.basicConfig, which only configures
+        logging the first time it is called in a process
         """
         logging.basicConfig(level=log_level)
         self.logger = logging.getLogger(__name__)
@@ -63,14 +111,21 @@ class Loadshape(object):
         self.temp_units = temp_units
         self.sq_ft      = sq_ft
         self.tariff     = tariff
+        self.cache_dir  = cache_dir
+        self.scheduler  = scheduler
+        self.result_cache = result_cache
+
+        self.weather_station    = weather_station
+        self.weather_source     = weather_source
+        self._temperature_grids = {}
+        if weather_station != None:
+            temp_data = weather.station(weather_station, weather_source)
 
         self.training_load_series           = self._get_series(load_data)
         self.training_temperature_series    = self._get_series(temp_data)
         self.forecast_temperature_series    = self._get_series(forecast_temp_data)
         
-        self._stderr = None
-        self._stdout = None
-
+        self._lock = threading.RLock()
         self._reset_derivative_data()
 
     # ----- derivative data generators ----- #
@@ -80,7 +135,8 @@ class Loadshape(object):
     #                       various performance statistics
     #
     def baseline(self, start_at=None, end_at=None,
-                 weighting_days=14, modeling_interval=900, step_size=900):
+                 weighting_days=14, modeling_interval=900, step_size=900,
+                 time_grid=None):
         """baseline load shape generator: compiles necessary temporary files and
         shells out to R script:
         - training power data: timestamps and kW
@@ -93,68 +149,218 @@ class Loadshape(object):
         prediction period, the model will ignore the temperature data. In order
         to get temperature adjusted predictions, temperature data must be available
         for both the training data and the prediction period.
+
+        prediction times may be given as a TimeGrid instead of start_at / end_at
+        / step_size (this applies to diff and cost too)
         
         baseline.R
             --loadFile=LOAD_FILE
             --temperatureFile=TRAINING_TEMPERATURE_FILE
-            --timeStampFile=PREDICTION_TIME_STAMPS_FILE
+            --timeGrid=START,STEP,COUNT --timeZone=TIMEZONE
             --predictTemperatureFile=PREDICTION_TEMPERATURE_FILE
             --outputBaselineFile=OUTPUT_BASELINE_FILE
             --errorStatisticsFile=ERROR_STATISTICS_FILE
             --fahrenheit=BOOLEAN
             --timescaleDays=TIMESCALEDAYS
             --intervalMinutes=INTERVALMINUTES
+            --occupancyFile=OCCUPANCY_CACHE_FILE
         """
-        self._reset_derivative_data()
-    
-        output_times = self._build_output_time_series(start_at, end_at, step_size)
+        output_times = self._build_output_time_series(start_at, end_at, step_size,
+                                                      time_grid=time_grid)
+
+        model_args = { 'weighting_days': weighting_days,
+                       'modeling_interval': modeling_interval }
+
+        # ----- check result cache ----- #
+        key = self._cache_key('baseline.R', output_times.options(),
+                              weighting_days, modeling_interval,
+                              self.training_load_series.fingerprint(),
+                              self._fingerprint(self.training_temperature_series),
+                              self._fingerprint(self.forecast_temperature_series))
+        cached = self._cache_get(key)
+        if cached != None:
+            baseline_series = Series.from_arrays(cached['times'], cached['values'],
+                                                 self.timezone, trusted=True)
+            error_stats = dict(zip([str(n) for n in cached['stat_names']],
+                                   cached['stat_values'].tolist()))
+            return self._set_baseline(baseline_series, error_stats, model_args)
         
         # ----- write temporary files ----- #
         baseline_tmp    = tempfile.NamedTemporaryFile()
         error_stats_tmp = tempfile.NamedTemporaryFile()
         power_tmp       = self.training_load_series.write_to_tempfile()
-        prediction_tmp  = output_times.write_to_tempfile()
 
         # ----- build command ----- #
         cmd = path.join(self.model_dir, 'baseline.R')
         cmd += " --loadFile=%s"                 % power_tmp.name
-        cmd += " --timeStampFile=%s"            % prediction_tmp.name
+        cmd += output_times.options()
         cmd += " --outputBaselineFile=%s"       % baseline_tmp.name
         cmd += " --errorStatisticsFile=%s"      % error_stats_tmp.name
         cmd += " --timescaleDays=%s"            % weighting_days
         cmd += " --intervalMinutes=%s"          % (modeling_interval / 60)
 
         # ----- add in available temperature data ----- #
-        if self.training_temperature_series != None:
-            t_temp_tmp = self.training_temperature_series.write_to_tempfile()
-            cmd += " --temperatureFile=%s" % t_temp_tmp.name
-            f_flag = str(self.training_temperature_series.is_farenheit()).upper()
-            cmd += " --fahrenheit=%s" % f_flag
-            
-            if self.forecast_temperature_series != None:
-                ptemp_temp = self.forecast_temperature_series.write_to_tempfile()
-                cmd += " --predictTemperatureFile=%s" % ptemp_temp.name
+        cmd += self._temperature_options(modeling_interval, power_tmp)
 
         # ----- run script ----- #
-        self._run_script(cmd)
+        ran = self._run_script(cmd).succeeded()
 
         # ----- process results ----- #
-        self.baseline_series = Series(baseline_tmp.name, self.timezone)
-        self.error_stats = self._read_error_stats(error_stats_tmp.name)
+        baseline_series = Series(baseline_tmp.name, self.timezone)
+        error_stats = self._read_error_stats(error_stats_tmp.name)
+
+        if (key != None) and ran:
+            times, values = baseline_series.arrays()
+            names = sorted(error_stats.keys())
+            self.result_cache.put(key, times=times, values=values,
+                                  stat_names=numpy.array(names, dtype=str),
+                                  stat_values=numpy.array([error_stats[n] for n in names],
+                                                          dtype=numpy.float64))
         
-        return self.baseline_series
+        return self._set_baseline(baseline_series, error_stats, model_args)
+
+    def rolling_baselines(self, start_at, end_at, horizon=1, weighting_days=14,
+                          modeling_interval=900, step_size=900):
+        """rolling-origin backtest: for every day from start_at through end_at,
+        the baseline predicted using only the data up to the start of that day
+        - one R run produces every day; each day's baseline is the one that
+        baseline() would have made from the data up to the start of that day
+        (occupied/unoccupied map and temperature ranges included)
+        - every day is a full refit: the model runs' centres and weights
+        change with each day of data, so no fit is reused from one day to the
+        next. The saving over calling baseline() for each day is one R start
+        and one read of the input files, not fewer fits
+        - with horizon > 1, each origin also predicts the following days, so
+        each day has a baseline predicted 1..horizon days ahead
+
+        returns a SeriesFrame over the prediction times with columns:
+        - actual:       load at the prediction times
+        - baseline_N:   baseline predicted at the start of the day N-1 days earlier
+        - error_N:      actual - baseline_N
+
+        baseline.R additionally receives
+            --rollingOriginFile=DAY_BOUNDARIES_FILE
+            --horizonDays=HORIZON
+        """
+        origins = self._day_boundaries(start_at, end_at, horizon)
+        output_times = self._build_output_time_series(origins[0] + step_size,
+                                                      origins[-1], step_size)
+
+        # ----- write temporary files ----- #
+        baseline_tmp    = tempfile.NamedTemporaryFile()
+        power_tmp       = self.training_load_series.write_to_tempfile()
+        origins_tmp     = Series.from_arrays(origins, numpy.zeros(len(origins)),
+                                             self.timezone, trusted=True).write_to_tempfile()
+
+        # ----- build command ----- #
+        cmd = path.join(self.model_dir, 'baseline.R')
+        cmd += " --loadFile=%s"                 % power_tmp.name
+        cmd += output_times.options()
+        cmd += " --outputBaselineFile=%s"       % baseline_tmp.name
+        cmd += " --timescaleDays=%s"            % weighting_days
+        cmd += " --intervalMinutes=%s"          % (modeling_interval / 60)
+        cmd += " --rollingOriginFile=%s"        % origins_tmp.name
+        cmd += " --horizonDays=%s"              % horizon
+        cmd += self._temperature_options(modeling_interval, power_tmp,
+                                         forecast=False, occupancy_cache=False)
+
+        # ----- run script ----- #
+        self._run_script(cmd)
+
+        # ----- process results ----- #
+        leads = range(1, horizon + 1)
+        grid, baselines = read_csv_columns(baseline_tmp.name, leads, self.timezone)
+
+        times, values = self.training_load_series.arrays()
+        actual = numpy.round(numpy.interp(grid, times, values), 2)
+        actual[(grid < times[0]) | (grid > times[-1])] = numpy.nan
+
+        columns = [('actual', actual)]
+        for lead in leads:
+            columns.append(('baseline_%s' % lead, baselines[lead - 1]))
+            columns.append(('error_%s' % lead, actual - baselines[lead - 1]))
+        return SeriesFrame(grid, columns, self.timezone)
+
+    def scenario_baselines(self, scenarios, start_at=None, end_at=None,
+                           weighting_days=14, modeling_interval=900, step_size=900,
+                           time_grid=None):
+        """baselines under several forecast temperature scenarios (ex: the
+        members of a weather forecast ensemble) from one R run
+        - the weighted regressions are fit once; each fit predicts every
+        scenario in one evaluation, so scenarios add little to the run time
+        - scenarios may be a list (columns scenario_1, scenario_2, ...), a dict
+        of name: data (an OrderedDict keeps its order, other dicts are sorted
+        by name), a SeriesFrame or a pandas DataFrame (one column per scenario);
+        list and dict values may be anything accepted as forecast_temp_data
+        - scenario temperatures are interpolated to the prediction times and
+        must cover them; they are in the units of the training temperatures
+        - baseline_series and error_stats are left unchanged
+
+        returns a SeriesFrame over the prediction times with one baseline
+        column per scenario
+
+        baseline.R additionally receives
+            --scenarioTemperatureFile=SCENARIO_TEMPERATURE_FILE
+        (timestamp followed by one temperature column per scenario)
+        """
+        if self.training_temperature_series == None:
+            raise Exception("temperature scenarios require training temperature data")
+
+        output_times = self._build_output_time_series(start_at, end_at, step_size,
+                                                      time_grid=time_grid)
+        times, _ = output_times.arrays()
+        scenario_frame = self._scenario_frame(scenarios, times)
+
+        # ----- check result cache ----- #
+        key = self._cache_key('baseline.R', 'scenarios', output_times.options(),
+                              weighting_days, modeling_interval,
+                              self.training_load_series.fingerprint(),
+                              self._fingerprint(self.training_temperature_series),
+                              scenario_frame.names,
+                              hashlib.sha1(scenario_frame.values.tobytes()).hexdigest())
+        cached = self._cache_get(key)
+        if cached != None: return self._frame_from_cache(cached)
+
+        # ----- write temporary files ----- #
+        baseline_tmp    = tempfile.NamedTemporaryFile()
+        error_stats_tmp = tempfile.NamedTemporaryFile()
+        power_tmp       = self.training_load_series.write_to_tempfile()
+        scenario_tmp    = scenario_frame.write_to_file(tempfile.NamedTemporaryFile())
 
-    def cost(self, load_data=None, start_at=None, end_at=None, step_count=None):
+        # ----- build command ----- #
+        cmd = path.join(self.model_dir, 'baseline.R')
+        cmd += " --loadFile=%s"                 % power_tmp.name
+        cmd += output_times.options()
+        cmd += " --outputBaselineFile=%s"       % baseline_tmp.name
+        cmd += " --errorStatisticsFile=%s"      % error_stats_tmp.name
+        cmd += " --timescaleDays=%s"            % weighting_days
+        cmd += " --intervalMinutes=%s"          % (modeling_interval / 60)
+        cmd += " --scenarioTemperatureFile=%s"  % scenario_tmp.name
+        cmd += self._temperature_options(modeling_interval, power_tmp, forecast=False)
+
+        # ----- run script ----- #
+        ran = self._run_script(cmd).succeeded()
+
+        # ----- process results ----- #
+        frame = SeriesFrame.from_csv(baseline_tmp.name, scenario_frame.names, self.timezone)
+        if ran: self._cache_frame(key, frame)
+        return frame
+
+    def cost(self, load_data=None, start_at=None, end_at=None, step_count=None,
+             time_grid=None):
         """calculate the cost of energy based on the provided tariff
 
         R script produces one output file:
         timestamp, previous-interval-cost, cumulative-previous-interval-cost
 
+        returns a SeriesFrame with cost and cumulative_cost columns (which can be
+        unpacked as: cost, cumulative_cost = l.cost())
+
         [tariff.R command]
         ./tariff.R
             --loadFile=LOAD_FILE
             --tariffFile=TARIFF_FILE
-            --outputTimestampFile=OUTPUT_TIMES_FILE
+            --timeGrid=START,STEP,COUNT --timeZone=TIMEZONE
             --demandResponseFile=DEMAND_RESPONSE_DATES
             --outputFile=OUTPUT_FILE
         """
@@ -167,81 +373,128 @@ class Loadshape(object):
 
         output_times = self._build_output_time_series(start_at, end_at,
                                                       step_size=900,
-                                                      step_count=step_count)
+                                                      step_count=step_count,
+                                                      time_grid=time_grid)
+
+        # ----- check result cache ----- #
+        key = self._cache_key('tariff.R', output_times.options(),
+                              load_data.fingerprint(exclude=False),
+                              self.tariff.fingerprint())
+        cached = self._cache_get(key)
+        if cached != None: return self._frame_from_cache(cached)
 
         # ----- write temporary files ----- #
         load_tmp            = load_data.write_to_tempfile(exclude=False)
         tariff_tmp          = self.tariff.write_tariff_to_tempfile()
-        output_times_tmp    = output_times.write_to_tempfile()
         output_tmp          = tempfile.NamedTemporaryFile()
 
         # ----- build command ----- #
         cmd = path.join(self.model_dir, 'tariff.R')
         cmd += " --loadFile=%s"             % load_tmp.name
         cmd += " --tariffFile=%s"           % tariff_tmp.name
-        cmd += " --outputTimestampFile=%s"  % output_times_tmp.name
+        cmd += output_times.options()
         cmd += " --outputFile=%s"           % output_tmp.name
 
         if len(self.tariff.dr_periods) > 0:
             dr_periods_tmp = self.tariff.write_dr_periods_to_tempfile()
             cmd += " --demandResponseFile=%s" % dr_periods_tmp.name
 
-        self._run_script(cmd)
+        ran = self._run_script(cmd).succeeded()
         
         # ----- process results ----- #
-        cost_series             = Series(output_tmp.name, self.timezone, data_column=1)
-        cumulative_cost_series  = Series(output_tmp.name, self.timezone, data_column=2)
-
-        return cost_series, cumulative_cost_series
+        frame = SeriesFrame.from_csv(output_tmp.name, ['cost', 'cumulative_cost'],
+                                     self.timezone)
+        if ran: self._cache_frame(key, frame)
+        return frame
             
-    def diff(self, start_at=None, end_at=None, step_size=900, step_count=None):
+    def diff(self, start_at=None, end_at=None, step_size=900, step_count=None,
+             time_grid=None, baseline_series=None):
         """calculate the difference between baseline and actual
 
-        R script produces two output files:
-        (1) diff:       timestamp,  kw_diff,    cumulative_kwh_diff
-        (2) baseline:   timestamp,  kw_base,    cumulative_kwh_base
+        R script produces one output file:
+        timestamp, kw_diff, kw_base, cumulative_kwh_diff, cumulative_kwh_base
+
+        returns a SeriesFrame with those columns, which can be unpacked as:
+        kw_diff, kw_base, cumulative_kwh_diff, cumulative_kwh_base = l.diff()
+
+        the difference is taken from baseline_series if provided, otherwise from
+        the current baseline (which is generated if there is none yet)
 
         [diff.R command]
         ./diff.R
             --loadFile=LOAD_FILE
             --baselineFile=BASELINE_LOAD_FILE
-            --outputTimesFile=OUTPUT_TIMES_FILE
-            --outputFile=OUTPUT_DIFF_FILE
-            --predictedBaselineOutputFile=OUTPUT_BASE_FILE
+            --timeGrid=START,STEP,COUNT --timeZone=TIMEZONE
+            --combinedOutputFile=OUTPUT_FILE
         """
-        if self.baseline_series == None: self.baseline()
+        if baseline_series == None: baseline_series, _ = self._current_baseline()
         
         output_times = self._build_output_time_series(start_at, end_at,
-                                                      step_size, step_count)
+                                                      step_size, step_count,
+                                                      time_grid=time_grid)
+
+        # ----- check result cache ----- #
+        key = self._cache_key('diff.R', output_times.options(),
+                              self.training_load_series.fingerprint(exclude=False),
+                              baseline_series.fingerprint())
+        cached = self._cache_get(key)
+        if cached != None: return self._frame_from_cache(cached)
 
         # ----- write temporary files ----- #
         load_tmp            = self.training_load_series.write_to_tempfile(exclude=False)
-        baseline_tmp        = self.baseline_series.write_to_tempfile()
-        output_times_tmp    = output_times.write_to_tempfile()
-        output_diff_tmp     = tempfile.NamedTemporaryFile()
-        output_base_tmp     = tempfile.NamedTemporaryFile()
+        baseline_tmp        = baseline_series.write_to_tempfile()
+        output_tmp          = tempfile.NamedTemporaryFile()
         
         # ----- build command ----- #
         cmd = path.join(self.model_dir, 'diff.R')
         cmd += " --loadFile=%s"                     % load_tmp.name
         cmd += " --baselineFile=%s"                 % baseline_tmp.name
-        cmd += " --outputTimesFile=%s"              % output_times_tmp.name
-        cmd += " --outputFile=%s"                   % output_diff_tmp.name
-        cmd += " --predictedBaselineOutputFile=%s"  % output_base_tmp.name
+        cmd += output_times.options()
+        cmd += " --combinedOutputFile=%s"           % output_tmp.name
         
         # ----- run script ----- #
-        self._run_script(cmd)
+        ran = self._run_script(cmd).succeeded()
 
         # ----- process results ----- #
-        kw_diff = Series(output_diff_tmp.name, self.timezone, data_column=1)
-        kw_base = Series(output_base_tmp.name, self.timezone, data_column=1)
-
-        cumulative_kwh_diff = Series(output_diff_tmp.name, self.timezone, data_column=2)
-        cumulative_kwh_base = Series(output_base_tmp.name, self.timezone, data_column=2)
-
-        return kw_diff, kw_base, cumulative_kwh_diff, cumulative_kwh_base
+        frame = SeriesFrame.from_csv(output_tmp.name, ['kw_diff', 'kw_base',
+                                                       'cumulative_kwh_diff',
+                                                       'cumulative_kwh_base'],
+                                     self.timezone)
+        if ran: self._cache_frame(key, frame)
+        return frame
         
-    def event_performance(self, start_at=None, end_at=None):
+    def baseline_bands(self, start_at=None, end_at=None, step_size=900, time_grid=None,
+                       replicates=200, confidence=0.9, block_days=1, seed=None):
+        """bootstrap uncertainty band around the current baseline
+        - whole days of training residuals are resampled (block_days at a
+        time) and the model is refit for each replicate, see bootstrap.py
+        - the band is the baseline plus the confidence percentile range of the
+        replicates' differences from the refit model
+        - the refit model is a simplified version of baseline.R's: there is no
+        occupied / unoccupied split, and there is one Cauchy weighting centred
+        on the middle of the prediction period instead of baseline.R's
+        weighting per run. The band is an estimate of the baseline's
+        uncertainty, not a prediction interval for the R baseline itself
+
+        returns a SeriesFrame with baseline, lower and upper columns
+        """
+        baseline_series, model_args = self._current_baseline()
+        output_times = self._build_output_time_series(start_at, end_at, step_size,
+                                                      time_grid=time_grid)
+        times, _ = output_times.arrays()
+
+        deviations = self._bootstrap_deviations(times, model_args, replicates,
+                                                block_days, seed)
+        lower, upper = bootstrap.percentile_band(deviations, confidence, axis=1)
+        base = self._values_at(baseline_series, times)
+
+        return SeriesFrame(times, [('baseline', base),
+                                   ('lower', numpy.maximum(base + lower, 0)),
+                                   ('upper', numpy.maximum(base + upper, 0))],
+                           self.timezone)
+
+    def event_performance(self, start_at=None, end_at=None, replicates=0,
+                          confidence=0.9, block_days=1, seed=None):
         """calcualte the event performance for a specific period of time
         returned performance metrics:
             - avg_kw_shed:              (average kW diff)
@@ -251,21 +504,23 @@ class Loadshape(object):
             - total_savings ($)
             - total_percent_savings ($)
             - avg_w_sq_ft_shed          (average kW shed * 1000 / sq_ft)
+
+        with replicates > 0, bootstrap bands (see baseline_bands) are added:
+            - kwh_reduction_lower, kwh_reduction_upper
+            - total_savings_lower, total_savings_upper ($)
         """
         # get diff values for period by diffing over a single interval
-        diff_data = self.diff(start_at, end_at, step_count=1)
-        kw_diff_series = diff_data[0]
-        kw_base_series = diff_data[1]
-        cumulative_kwh_diff_series = diff_data[2]
-        cumulative_kwh_base_series = diff_data[3]
+        baseline_series, model_args = self._current_baseline()
+        diff_data = self.diff(start_at, end_at, step_count=1,
+                              baseline_series=baseline_series)
 
         # extract data from diff series
         ep = {}
-        ep["avg_kw_shed"]           = kw_diff_series.values()[-1] * -1
-        avg_kw_base                 = kw_base_series.values()[-1]
+        ep["avg_kw_shed"]           = float(diff_data.column('kw_diff')[-1]) * -1
+        avg_kw_base                 = float(diff_data.column('kw_base')[-1])
         ep["avg_percent_kw_shed"]   = (ep["avg_kw_shed"] / avg_kw_base) * 100
-        ep["kwh_reduction"]         = cumulative_kwh_diff_series.values()[-1] * -1
-        kwh_base                    = cumulative_kwh_base_series.values()[-1]
+        ep["kwh_reduction"]         = float(diff_data.column('cumulative_kwh_diff')[-1]) * -1
+        kwh_base                    = float(diff_data.column('cumulative_kwh_base')[-1])
         ep["percent_kwh_reduction"] = (ep["kwh_reduction"] / kwh_base) * 100
 
         # add in W per square feet if square footage was provided
@@ -274,22 +529,26 @@ class Loadshape(object):
 
         # calculate $ savings if tariff provided
         if self.tariff != None:
-            load_cost, load_cumulative_cost = self.cost(load_data=self.training_load_series,
-                                                        start_at=start_at,
-                                                        end_at=end_at,
-                                                        step_count=1)
+            load_cost = self.cost(load_data=self.training_load_series,
+                                  start_at=start_at,
+                                  end_at=end_at,
+                                  step_count=1)
 
-            base_cost, base_cumulative_cost = self.cost(load_data=self.baseline_series,
-                                                        start_at=start_at,
-                                                        end_at=end_at,
-                                                        step_count=1)
+            base_cost = self.cost(load_data=baseline_series,
+                                  start_at=start_at,
+                                  end_at=end_at,
+                                  step_count=1)
 
-            total_load_cost = load_cumulative_cost.values()[-1]
-            total_base_cost = base_cumulative_cost.values()[-1]
+            total_load_cost = float(load_cost.column('cumulative_cost')[-1])
+            total_base_cost = float(base_cost.column('cumulative_cost')[-1])
 
             ep["total_savings"] = total_base_cost - total_load_cost
             ep["total_percent_savings"] = (ep["total_savings"] / total_base_cost) * 100
 
+        if replicates > 0:
+            ep.update(self._savings_bands(ep, model_args, start_at, end_at,
+                                          replicates, confidence, block_days, seed))
+
         # round values to something reasonable
         for key, val in ep.iteritems():
             if isinstance(val, float): ep[key] = round(val, 2)
@@ -300,30 +559,33 @@ class Loadshape(object):
         """return accumulated sum of differences bewetween baseline and actual
         energy. Returns a series.
         """
-        if self.baseline_series == None: self.baseline()
-
         diff_data = self.diff(start_at, end_at, step_size)
-        cumulative_kwh_diff_series = diff_data[2]
+        cumulative_kwh_diff_series = diff_data['cumulative_kwh_diff']
         return cumulative_kwh_diff_series    
 
     def _run_script(self, command):
         self.logger.info("Running R script...")
 
-        p = Popen(command, shell=True, stdout=PIPE, stderr=PIPE)
-        stdout, stderr = p.communicate()
-
-        self._stdout = stdout
-        self._stderr = stderr
+        job = (self.scheduler or default_scheduler).run(command)
 
-        if stderr:
+        if job.stderr:
             self.logger.error(" --- R script error: --- ")
-            for l in stderr.splitlines(): print " --> %s" % l
+            for l in job.stderr.splitlines(): self.logger.error(" --> %s", l)
 
-        if stdout:
+        if job.stdout:
             self.logger.info(" --- R script info: --- ")
-            for l in stdout.splitlines(): print " --> %s" % l
+            for l in job.stdout.splitlines(): self.logger.info(" --> %s", l)
 
-        return True
+        if job.killed:
+            raise Exception("R script was killed after running for %.0f seconds" % job.ran_for)
+
+        return job
+
+    def calendar_features(self, start_at=None, end_at=None, step_size=900, holidays=None):
+        """calendar features of the output times used by baseline / diff / cost
+        for the same arguments (shared, computed once per grid and timezone)
+        """
+        return self._build_output_time_series(start_at, end_at, step_size).calendar(holidays)
 
     def actual_data(self, start_at, end_at, exclude=False, step_size=None):
         return self.training_load_series.data(start_at=start_at, end_at=end_at, exclude=exclude, step_size=step_size)
@@ -331,6 +593,19 @@ class Loadshape(object):
     def baseline_data(self, start_at, end_at, exclude=False, step_size=None):
         return self.baseline_series.data(start_at=start_at, end_at=end_at, exclude=exclude, step_size=step_size)
 
+    def write_parquet(self, filename, columns=None, **kwargs):
+        """write result series to a single parquet file (requires pyarrow)
+        - columns is a list of (name, Series) pairs, ex: the outputs of diff
+        or cost; by default the actual load and the baseline are written
+        - the file has one row per timestamp and one column per series
+        """
+        if columns == None:
+            columns = [('kw', self.training_load_series)]
+            if self.baseline_series != None:
+                columns.append(('kw_base', self.baseline_series))
+
+        return columnar.write_parquet(filename, columns, self.timezone, **kwargs)
+
     def add_exclusion(self, start_at, end_at):
         """proxy add_exclusion to series"""
         self.training_load_series.add_exclusion(start_at, end_at)
@@ -347,27 +622,61 @@ class Loadshape(object):
         """add or replace tariff"""
         self.tariff = tariff
 
+    def share_memory(self, directory=None):
+        """share the input series through memory mapped files so that the
+        Loadshape can be passed to multiprocessing workers without copying
+        """
+        for series in self._input_series():
+            series.share_memory(directory)
+
+    def release_memory(self):
+        """proxy release_memory to the input series"""
+        for series in self._input_series():
+            series.release_memory()
+
+    def _input_series(self):
+        return [s for s in [self.training_load_series,
+                            self.training_temperature_series,
+                            self.forecast_temperature_series] if s != None]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['logger']
+        del state['_lock']
+        state['scheduler'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+
     def _get_series(self, data):
         """returns a series built from the data arg
         - if the data arg is None: return None
         - if the data arg is a Series: return the Series
         - if the data arg is a string: attempt to build Series from file path
         - if the data arg is a List: attempt to build Series from list
+        - if the data arg is a pandas Series / DataFrame: see Series.from_pandas
         """
-        if (isinstance(data, Series)) | (data == None):
+        if isinstance(data, Series) or (data is None):
             return data
+        elif type(data).__module__.startswith('pandas'):
+            return Series.from_pandas(data, timezone=self.timezone, temp_units=self.temp_units)
         else:
             return Series(data, self.timezone, self.temp_units)
 
     def _build_output_time_series(self, start_at=None, end_at=None,
-                                  step_size=900, step_count=None):
-        """assemble prediction series:
-        - this is the series of timestamps for which baseline values will be calculated
-        - the prediction series is stored in a Series object to take advantage of some of the Series features
+                                  step_size=900, step_count=None, time_grid=None):
+        """assemble prediction times:
+        - this is the TimeGrid of timestamps for which baseline values will be calculated
         - default start_at/end is training_load_series.start_at/end_at
         - default prediction step is 900s
         - step_count will trump step_size
+        - a time_grid, if provided, is used as is
         """
+        if time_grid != None: return time_grid
+
         if start_at == None: start_at = self.training_load_series.start_at()
         if end_at == None: end_at = self.training_load_series.end_at()
         
@@ -378,10 +687,114 @@ class Loadshape(object):
             duration = end_at - start_at
             step_size = int(float(duration) / step_count)
 
-        p_data = range(start_at, end_at+1, step_size)
-        p_data = [(v, 0) for v in p_data]
-        
-        return Series(p_data, self.timezone)
+        return TimeGrid.between(start_at, end_at, step_size, self.timezone)
+
+    def _temperature_options(self, modeling_interval, power_tmp,
+                             forecast=True, occupancy_cache=True):
+        """baseline.R arguments for the available temperature data"""
+        if self.training_temperature_series == None: return ""
+
+        t_temp_tmp = self._temperature_tempfile()
+        f_flag = str(self.training_temperature_series.is_farenheit()).upper()
+        options = " --temperatureFile=%s --fahrenheit=%s" % (t_temp_tmp.name, f_flag)
+
+        if forecast and (self.forecast_temperature_series != None):
+            ptemp_temp = self.forecast_temperature_series.write_to_tempfile()
+            options += " --predictTemperatureFile=%s" % ptemp_temp.name
+
+        if occupancy_cache and (self.cache_dir != None):
+            occupancy_file = self._occupancy_cache_file(modeling_interval, f_flag,
+                                                        power_tmp, t_temp_tmp)
+            options += " --occupancyFile=%s" % occupancy_file
+
+        return options
+
+    def _day_boundaries(self, start_at, end_at, horizon=0):
+        """unix times of the local midnights from the day of start_at through
+        horizon days after the day of end_at
+        """
+        start_day = utils.int_to_datetime(utils.read_timestamp(start_at, self.timezone),
+                                          self.timezone).date()
+        end_day = utils.int_to_datetime(utils.read_timestamp(end_at, self.timezone),
+                                        self.timezone).date()
+        n_days = (end_day - start_day).days + 1
+        if n_days < 1: raise Exception("end_at must not be before start_at")
+
+        boundaries = []
+        for i in range(n_days + horizon):
+            day = datetime.datetime.combine(start_day + datetime.timedelta(days=i),
+                                            datetime.time())
+            boundaries.append(utils.datetime_to_int(self.timezone.localize(day)))
+        return boundaries
+
+    def _temperature_tempfile(self):
+        """registered weather stations are interpolated onto a grid that lines
+        up with the load timestamps once, and the file is shared by every
+        building that uses the station
+        - the model is always given the temperatures this Loadshape was built
+        with (which its result cache keys describe): if the station has been
+        registered again since, its own copy is interpolated instead
+        """
+        if self.weather_station == None:
+            return self.training_temperature_series.write_to_tempfile()
+
+        step = weather.registry.grid_step(self.training_load_series)
+        shared = weather.registry.write_to_tempfile(self.weather_station, self.weather_source,
+                                                    step, self.training_temperature_series)
+        if shared != None: return shared
+
+        with self._lock:
+            if step not in self._temperature_grids:
+                self._temperature_grids[step] = weather.interpolate(
+                    self.training_temperature_series, step)
+            return self._temperature_grids[step].write_to_tempfile()
+
+    def _occupancy_cache_file(self, modeling_interval, f_flag, *input_files):
+        """occupancy maps are keyed by the training data that is passed to the
+        model (which identifies the building and the training window, including
+        exclusions), the modeling interval, and the temperature units
+        """
+        key = hashlib.sha1("%s,%s" % (modeling_interval, f_flag))
+        for input_file in input_files:
+            with open(input_file.name, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''): key.update(chunk)
+
+        occupancy_dir = path.join(self.cache_dir, 'occupancy')
+        if not path.isdir(occupancy_dir):
+            try: makedirs(occupancy_dir)
+            except OSError:
+                if not path.isdir(occupancy_dir): raise
+
+        return path.join(occupancy_dir, "%s.csv" % key.hexdigest())
+
+    def _cache_key(self, script, *parts):
+        """result cache key for a model script and its inputs, or None if
+        there is no result cache
+        """
+        if self.result_cache == None: return None
+
+        if script not in _script_digests:
+            with open(path.join(self.model_dir, script), 'rb') as f:
+                _script_digests[script] = hashlib.sha1(f.read()).hexdigest()
+
+        return ResultCache.key(script, _script_digests[script], *parts)
+
+    def _cache_get(self, key):
+        if key == None: return None
+        return self.result_cache.get(key)
+
+    def _cache_frame(self, key, frame):
+        if key == None: return
+        self.result_cache.put(key, times=frame.times, values=frame.values,
+                              names=numpy.array(frame.names, dtype=str))
+
+    def _frame_from_cache(self, cached):
+        names = [str(n) for n in cached['names']]
+        return SeriesFrame(cached['times'], zip(names, cached['values']), self.timezone)
+
+    def _fingerprint(self, series):
+        if series == None: return None
+        return series.fingerprint()
 
     def _read_error_stats(self, error_stats_file):
         """read error stats file and return values"""
@@ -393,8 +806,120 @@ class Loadshape(object):
                 
         return error_stats
 
+    def _set_baseline(self, baseline_series, error_stats, model_args):
+        with self._lock:
+            self.baseline_series    = baseline_series
+            self.error_stats        = error_stats
+            self._model_args        = model_args
+        return baseline_series
+
+    def _current_baseline(self):
+        """the current baseline_series and the model arguments it was generated
+        with; generated with the default arguments if there is none yet
+        """
+        with self._lock:
+            if self.baseline_series != None:
+                return self.baseline_series, self._model_args
+
+        self.baseline()
+        with self._lock:
+            return self.baseline_series, self._model_args
+
+    def _bootstrap_deviations(self, times, model_args, replicates, block_days, seed):
+        """bootstrap replicate predictions at times minus the refit model's
+        predictions (one column per replicate), see bootstrap.BaselineBootstrap
+        """
+        load = self.training_load_series
+        train_times, kw = load.arrays()
+        keep = numpy.ones(len(train_times), dtype=bool)
+        for exclusion in load.exclusions: keep &= load._exclude(train_times, exclusion)
+        train_times, kw = train_times[keep], kw[keep]
+
+        temps, prediction_temps, temp_units = None, None, 'F'
+        if self.training_temperature_series != None:
+            forecast = self.forecast_temperature_series
+            if forecast == None: forecast = self.training_temperature_series
+
+            temps = self._values_at(self.training_temperature_series, train_times)
+            prediction_temps = self._values_at(forecast, times)
+            temp_units = self.training_temperature_series.temp_units
+
+            # as in baseline.R, temperatures are only used if they cover the
+            # prediction times
+            if numpy.isnan(prediction_temps).any(): temps, prediction_temps = None, None
+
+        model = bootstrap.BaselineBootstrap(self.timezone,
+                                            model_args['modeling_interval'] / 60,
+                                            model_args['weighting_days'],
+                                            temp_units, block_days)
+        model.fit(train_times, kw, times, temps, prediction_temps)
+        return model.deviations(replicates, seed)
+
+    def _savings_bands(self, ep, model_args, start_at, end_at, replicates,
+                       confidence, block_days, seed):
+        """bootstrap bands for kwh_reduction and total_savings: each replicate
+        shifts the baseline energy (and, at the tariff's energy price for
+        each interval, the baseline cost) by its difference from the refit model
+        """
+        grid = self._build_output_time_series(start_at, end_at)
+        times, _ = grid.arrays()
+        if len(times) < 2: raise Exception("event period is shorter than one interval")
+
+        deviations = self._bootstrap_deviations(times, model_args, replicates,
+                                                block_days, seed)
+
+        # trapezoids between grid points: kWh in each interval per replicate
+        hours = numpy.diff(times) / 3600.0
+        interval_kwh = (deviations[:-1] + deviations[1:]) / 2 * hours[:, numpy.newaxis]
+
+        bands = {}
+        lower, upper = bootstrap.percentile_band(interval_kwh.sum(axis=0), confidence)
+        bands["kwh_reduction_lower"] = ep["kwh_reduction"] + float(lower)
+        bands["kwh_reduction_upper"] = ep["kwh_reduction"] + float(upper)
+
+        if self.tariff != None:
+            # each interval at the energy price in effect when it ends
+            prices = self.tariff.energy_prices(times[1:])
+
+            savings = (interval_kwh * prices[:, numpy.newaxis]).sum(axis=0)
+            lower, upper = bootstrap.percentile_band(savings, confidence)
+            bands["total_savings_lower"] = ep["total_savings"] + float(lower)
+            bands["total_savings_upper"] = ep["total_savings"] + float(upper)
+
+        return bands
+
+    def _values_at(self, series, times):
+        """series values interpolated at times, nan outside of the series"""
+        series_times, values = series.arrays()
+        if len(series_times) == 0: return numpy.repeat(numpy.nan, len(times))
+        return numpy.interp(times, series_times, values, left=numpy.nan, right=numpy.nan)
+
+    def _scenario_frame(self, scenarios, times):
+        """temperature scenarios interpolated to times, one column per scenario"""
+        if isinstance(scenarios, SeriesFrame):
+            named = scenarios.items()
+        elif type(scenarios).__module__.startswith('pandas'):
+            named = SeriesFrame.from_pandas(scenarios, self.timezone, self.temp_units).items()
+        elif isinstance(scenarios, OrderedDict):
+            named = scenarios.items()
+        elif isinstance(scenarios, dict):
+            named = sorted(scenarios.items())
+        else:
+            named = [("scenario_%s" % (i + 1), data) for i, data in enumerate(scenarios)]
+
+        if len(named) == 0: raise Exception("no temperature scenarios provided")
+
+        columns = []
+        for name, data in named:
+            values = self._values_at(self._get_series(data), times)
+            if numpy.isnan(values).any():
+                raise Exception("temperature scenario %s does not cover the prediction times" % name)
+            columns.append((str(name), values))
+        return SeriesFrame(times, columns, self.timezone, self.temp_units)
+
     def _reset_derivative_data(self):
         self.baseline_series                = None
         self.error_stats                    = None
+        self._model_args                    = None
         self.base_cost_series               = None
         self.load_cost_series               = None
@@ -0,0 +1,240 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import csv
+import math
+import utils
+import numpy
+import calendar_features
+
+from series import Series
+
+# temperature knots used by the baseline model (degrees F, applied in degrees C)
+TEMPERATURE_KNOTS_F = [40, 55, 65, 80, 90]
+
+class OnlineBaseline(object):
+
+    def __init__(self, timezone=None, temp_units='F', interval_minutes=15,
+                 weighting_days=14, use_temperature=True,
+                 occupied_intervals=None, initial_covariance=1e4):
+        """online version of the time-of-week and temperature baseline model
+        - the design matches fitLBNLregress in baseline.R: one indicator per
+        time-of-week interval plus piecewise-linear temperature variables
+        - coefficients are updated by recursive least squares, so each update
+        and each prediction costs the same no matter how much history has been
+        seen
+        - older observations are discounted by exponential forgetting; the
+        forgetting rate is chosen so that an observation weighting_days old has
+        half the weight of a new one, which is where the Cauchy weighting
+        used by the batch model also falls to one half
+        - occupied_intervals may be a list of (1-based) time-of-week intervals
+        that are considered occupied, ex: as stored in an occupancy cache file;
+        if provided, occupied and unoccupied periods are modeled separately
+        """
+        if isinstance(timezone, str) | (timezone == None):
+            self.timezone = utils.get_timezone(timezone)
+        else:
+            self.timezone = timezone
+
+        self.temp_units         = temp_units.upper()
+        self.interval_minutes   = interval_minutes
+        self.weighting_days     = weighting_days
+        self.use_temperature    = use_temperature
+        self.initial_covariance = float(initial_covariance)
+
+        self.n_intervals = int(math.ceil(7 * 24 * 60 / float(interval_minutes)))
+        self.temp_knots = [(k - 32) * 5.0 / 9 for k in TEMPERATURE_KNOTS_F]
+        n_temp = len(self.temp_knots) + 1 if use_temperature else 0
+        self.n_params = self.n_intervals + n_temp
+
+        # forgetting factor per second of elapsed time
+        self.forgetting = 0.5 ** (1.0 / (weighting_days * 24 * 3600))
+
+        if occupied_intervals != None and len(occupied_intervals) > 2:
+            self.occupied_intervals = set(int(i) for i in occupied_intervals)
+        else:
+            self.occupied_intervals = set()
+
+        self.models = {}
+        for mode in self._modes():
+            self.models[mode] = {
+                'coefficients':  numpy.zeros(self.n_params),
+                'covariance':    numpy.eye(self.n_params) * self.initial_covariance,
+                'scale':         1.0,
+                'seen':          numpy.zeros(self.n_intervals, dtype=bool),
+                'last_update':   None,
+            }
+
+        self.n_updates = 0
+
+    # --- model interface --- #
+    def update(self, timestamp, kw, temp=None):
+        """add a single observation to the model
+        - returns False if the observation could not be used
+        """
+        try: kw = float(kw)
+        except: return False
+        if math.isnan(kw): return False
+
+        timestamp = utils.read_timestamp(timestamp, self.timezone)
+        x, interval = self._design_row(timestamp, temp)
+        if x is None: return False
+
+        model = self.models[self._mode(interval)]
+        self._forget(model, timestamp)
+
+        # the covariance is stored as covariance * scale so that forgetting
+        # does not have to touch the whole matrix on every update
+        theta   = model['coefficients']
+        P       = model['covariance']
+        scale   = model['scale']
+
+        # x is sparse: one time-of-week indicator plus the temperature columns
+        active  = numpy.flatnonzero(x)
+        Px      = numpy.dot(P[:, active], x[active]) * scale
+        gain    = Px / (1.0 + numpy.dot(x[active], Px[active]))
+
+        theta += gain * (kw - numpy.dot(x[active], theta[active]))
+        P -= numpy.outer(gain, Px / scale)
+
+        model['seen'][interval] = True
+        self.n_updates += 1
+        return True
+
+    def predict(self, timestamps, temps=None):
+        """baseline predictions for the timestamps provided
+        - temps must line up with timestamps if the model uses temperature
+        - times of week that have never been observed are not predicted
+        - returns a Series
+        """
+        if temps is None: temps = [None] * len(timestamps)
+
+        timestamps = [utils.read_timestamp(t, self.timezone) for t in timestamps]
+        # not calendar_features.features: streamed timestamps are rarely reused
+        intervals = calendar_features.CalendarFeatures(timestamps, self.timezone) \
+                                     .interval_of_week(self.interval_minutes)
+
+        predictions = []
+        for timestamp, interval, temp in zip(timestamps, intervals, temps):
+            x, interval = self._design_row(timestamp, temp, interval)
+            if x is None: continue
+
+            model = self.models[self._mode(interval)]
+            if not model['seen'][interval]: continue
+
+            value = numpy.dot(x, model['coefficients'])
+            predictions.append((timestamp, max(float(value), 0.0)))
+
+        return Series(predictions, self.timezone)
+
+    # --- design matrix helpers --- #
+    def interval_of_week(self, timestamp):
+        """0-based time-of-week interval; weeks start on Sunday, as in R"""
+        local = utils.int_to_datetime(timestamp, self.timezone)
+        wday = (local.weekday() + 1) % 7
+        minute_of_week = (24 * 60 * wday) + (60 * local.hour) + local.minute
+        return int(minute_of_week // self.interval_minutes)
+
+    def temperature_variables(self, temp):
+        """piecewise-linear temperature variables, see piecewiseVariables in
+        baseline.R
+        """
+        if self.temp_units == 'F': temp = (temp - 32) * 5.0 / 9
+
+        knots = [-1000000] + self.temp_knots + [1000000]
+        out = []
+        for i in range(len(knots) - 1):
+            lower, upper = knots[i], knots[i + 1]
+            if i == 0:
+                out.append(temp if temp <= upper else upper)
+            elif temp > upper:
+                out.append(upper - lower)
+            elif temp > lower:
+                out.append(temp - lower)
+            else:
+                out.append(0.0)
+
+        return out
+
+    def _design_row(self, timestamp, temp, interval=None):
+        if interval == None: interval = self.interval_of_week(timestamp)
+        interval = int(interval)
+
+        x = numpy.zeros(self.n_params)
+        x[interval] = 1.0
+
+        if self.use_temperature:
+            try: temp = float(temp)
+            except: return None, interval
+            if math.isnan(temp): return None, interval
+            x[self.n_intervals:] = self.temperature_variables(temp)
+
+        return x, interval
+
+    def _modes(self):
+        return ['occupied', 'unoccupied'] if self.occupied_intervals else ['unoccupied']
+
+    def _mode(self, interval):
+        return 'occupied' if (interval + 1) in self.occupied_intervals else 'unoccupied'
+
+    def _forget(self, model, timestamp):
+        """discount the information in the model by the time elapsed since
+        its last update, bounding the covariance so that parameters that are
+        rarely excited (ex: extreme temperature bins) do not wind up
+        """
+        last_update = model['last_update']
+        model['last_update'] = timestamp
+        if last_update == None or timestamp <= last_update: return
+
+        model['scale'] /= self.forgetting ** (timestamp - last_update)
+
+        # rescaling touches the whole matrix, so allow some slack before doing it
+        variance = numpy.diag(model['covariance']) * model['scale']
+        if variance.max() > 2 * self.initial_covariance:
+            bound = numpy.sqrt(numpy.minimum(1.0, self.initial_covariance / variance))
+            model['covariance'] *= numpy.outer(bound, bound) * model['scale']
+            model['scale'] = 1.0
+
+def read_occupancy_file(occupancy_file):
+    """read the occupied time-of-week intervals from an occupancy cache file
+    written by baseline.R
+    """
+    occupied = []
+    with open(occupancy_file, 'r') as f:
+        for ent in csv.reader(f):
+            if (not ent) or ent[0].startswith('#'): continue
+            if float(ent[1]) == 1: occupied.append(int(float(ent[0])))
+
+    return occupied
@@ -0,0 +1,160 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import os
+import errno
+import hashlib
+import tempfile
+import threading
+
+import numpy
+
+class ResultCache(object):
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        """results of model runs stored on local disk, keyed by a hash of
+        everything that went into them
+        - each entry is one .npz file of named arrays
+        - once the entries take up more than max_bytes, the least recently
+        used ones are removed
+        - the directory may be shared by several processes: entries are
+        written to a temporary file and renamed into place
+        """
+        self.directory  = directory
+        self.max_bytes  = max_bytes
+
+        self.lock       = threading.Lock()
+        self.hits       = 0
+        self.misses     = 0
+        self.stores     = 0
+        self.evictions  = 0
+
+        if not os.path.isdir(directory):
+            try: os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory): raise
+
+    @staticmethod
+    def key(*parts):
+        """hex digest of the key parts (strings, numbers, or tuples of them)"""
+        return hashlib.sha1(repr(parts)).hexdigest()
+
+    def get(self, key):
+        """dict of arrays stored under key, or None
+        - a hit marks the entry as recently used
+        """
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                entry = numpy.load(f)
+                arrays = dict((name, entry[name]) for name in entry.files)
+            os.utime(filename, None)
+        except (IOError, OSError, ValueError):
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        return arrays
+
+    def put(self, key, **arrays):
+        """store arrays under key, then evict down to max_bytes"""
+        fd, tmp_name = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                numpy.savez(f, **arrays)
+            os.rename(tmp_name, self._filename(key))
+        except:
+            self._remove(tmp_name)
+            raise
+
+        self._count('stores')
+        self._evict()
+
+    def stats(self):
+        with self.lock:
+            return { 'hits': self.hits, 'misses': self.misses,
+                     'stores': self.stores, 'evictions': self.evictions }
+
+    def clear(self):
+        """remove every entry"""
+        for filename, size, used_at in self._entries():
+            self._remove(filename)
+
+    def _filename(self, key):
+        return os.path.join(self.directory, "%s.npz" % key)
+
+    def _entries(self):
+        """(filename, size, last used) of each entry"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'): continue
+            filename = os.path.join(self.directory, name)
+            try:
+                info = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((filename, info.st_size, info.st_mtime))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for filename, size, used_at in entries)
+        for filename, size, used_at in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes: break
+            if self._remove(filename): self._count('evictions')
+            total -= size
+
+    def _remove(self, filename):
+        """remove a file another process may already have removed"""
+        try:
+            os.remove(filename)
+            return True
+        except OSError as e:
+            if e.errno != errno.ENOENT: raise
+            return False
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def __getstate__(self):
+        """locks do not pickle"""
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
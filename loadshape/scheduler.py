@@ -0,0 +1,201 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import os
+import time
+import signal
+import threading
+import multiprocessing
+
+from subprocess import Popen, PIPE
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class Job(object):
+
+    def __init__(self, command):
+        """the outcome of one scheduled command"""
+        self.command    = command
+        self.returncode = None
+        self.stdout     = ''
+        self.stderr     = ''
+        self.killed     = False
+        self.queued_for = 0.0
+        self.ran_for    = 0.0
+
+        # guards finished / killed between the worker and the timeout timer
+        self.lock       = threading.Lock()
+        self.finished   = False
+
+    def succeeded(self):
+        return (self.returncode == 0) and (not self.killed)
+
+class Scheduler(object):
+
+    def __init__(self, max_processes=None, timeout=None, memory_limit=None, max_queue=None):
+        """runs shell commands (the R model scripts) with bounded concurrency
+        - at most max_processes commands run at once, others wait their turn
+        - if max_queue commands are already waiting, new ones are refused
+        instead of piling up
+        - commands running longer than timeout (seconds) are killed
+        - memory_limit (bytes) caps the address space of each command
+        """
+        if max_processes == None: max_processes = multiprocessing.cpu_count()
+
+        self.max_processes  = max_processes
+        self.timeout        = timeout
+        self.memory_limit   = memory_limit
+        self.max_queue      = max_queue
+
+        self.condition  = threading.Condition()
+        self.running    = 0
+        self.queued     = 0
+        self.completed  = 0
+        self.killed     = 0
+        self.refused    = 0
+
+    def configure(self, **kwargs):
+        """change limits; running commands keep the limits they started with"""
+        with self.condition:
+            for name, value in kwargs.iteritems():
+                if name not in ('max_processes', 'timeout', 'memory_limit', 'max_queue'):
+                    raise Exception("unknown scheduler setting: %s" % name)
+                setattr(self, name, value)
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return { 'running': self.running, 'queued': self.queued,
+                     'completed': self.completed, 'killed': self.killed,
+                     'refused': self.refused, 'max_processes': self.max_processes }
+
+    def run(self, command, timeout=None, memory_limit=None):
+        """run a command once a slot is free and return its Job
+        - timeout / memory_limit override the scheduler defaults for this job
+        """
+        if timeout == None: timeout = self.timeout
+        if memory_limit == None: memory_limit = self.memory_limit
+
+        job = Job(command)
+        queued_at = time.time()
+        self._acquire()
+        job.queued_for = time.time() - queued_at
+
+        try:
+            self._execute(job, timeout, memory_limit)
+        finally:
+            self._release(job)
+
+        return job
+
+    # --- slots --- #
+    def _acquire(self):
+        with self.condition:
+            if (self.max_queue != None) and (self.running >= self.max_processes) \
+                    and (self.queued >= self.max_queue):
+                self.refused += 1
+                raise Exception("scheduler queue is full (%s waiting)" % self.queued)
+
+            self.queued += 1
+            try:
+                while self.running >= self.max_processes: self.condition.wait()
+            finally:
+                self.queued -= 1
+            self.running += 1
+
+    def _release(self, job):
+        with self.condition:
+            self.running -= 1
+            self.completed += 1
+            if job.killed: self.killed += 1
+            self.condition.notify()
+
+    # --- processes --- #
+    def _execute(self, job, timeout, memory_limit):
+        started_at = time.time()
+        p = Popen(job.command, shell=True, stdout=PIPE, stderr=PIPE,
+                  preexec_fn=self._limits(memory_limit))
+
+        timer = None
+        if timeout != None:
+            timer = threading.Timer(timeout, self._kill, [p, job])
+            timer.daemon = True
+            timer.start()
+
+        try:
+            job.stdout, job.stderr = p.communicate()
+        finally:
+            with job.lock: job.finished = True
+            if timer != None: timer.cancel()
+
+        job.returncode = p.returncode
+        job.ran_for = time.time() - started_at
+        return job
+
+    def _kill(self, p, job):
+        """kill the command and everything it started (Rscript runs in a shell)
+        - only the worker thread waits on the process (polling here could reap
+        it under communicate); job.finished tells whether it is still running
+        """
+        with job.lock:
+            if job.finished: return
+            job.killed = True
+            try:
+                os.killpg(p.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def _limits(self, memory_limit):
+        """child process setup: own process group, optional address space cap"""
+        def setup():
+            os.setsid()
+            if (memory_limit != None) and (resource != None):
+                resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        return setup
+
+# the scheduler used by every Loadshape that is not given its own
+default_scheduler = Scheduler()
+
+def configure(**kwargs):
+    """change the limits of the default scheduler, ex:
+    configure(max_processes=4, timeout=600, memory_limit=2 * 1024**3)
+    """
+    default_scheduler.configure(**kwargs)
+
+def stats():
+    return default_scheduler.stats()
@@ -33,13 +33,20 @@
 # owned rights.
 # --------------------------------------------------
 
+import os
 import csv
 import math
 import utils
 import numpy
+import hashlib
 import tempfile
 
+import columnar
 import exclusions
+import calendar_features
+
+# shared series buffers live here when available (memory backed on linux)
+SHARED_MEMORY_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
 
 class Series(object):
 
@@ -52,22 +59,228 @@ class Series(object):
         self.errors = []
         self.exclusions = []
         self.data_column = data_column
+
+        self._times = numpy.zeros(0, dtype=numpy.int64)
+        self._values = numpy.zeros(0, dtype=numpy.float64)
+        self._shared_file = None
+        self._shared_owner = False
+
+        # spare capacity for append, _times / _values are views into these
+        self._time_buffer = None
+        self._value_buffer = None
+
+        # bumped whenever the data or the exclusions change, see write_to_tempfile
+        self._data_version = 0
+        self._exclusion_version = 0
+        self._tempfiles = {}
+        self._fingerprints = {}
+        self._energy_index = None
         
         self.temp_units = temp_units.upper()
 
-        if isinstance(timezone, str) | (timezone == None):
-            self.timezone = utils.get_timezone(timezone)
-        else:
-            self.timezone = timezone
+        self.timezone = self._timezone(timezone)
         
         if isinstance(series, list):
             self.series = self.load_list(series)
         elif isinstance(series, str):
-            self.series = self.load_list_from_csv(series)
+            self._set_arrays(*self._read_csv(series))
 
         self._validate_series()
         self._sort_series()
     
+    # --- alternate constructors --- #
+    @classmethod
+    def from_arrays(cls, times, values, timezone=None, temp_units='F', trusted=False):
+        """build a series from a sequence of unix timestamps (seconds or
+        milliseconds) and a sequence of values
+        - entries with nan values are dropped
+        - fractional timestamps are rejected, not truncated
+        - trusted=True skips all checks; timestamps must already be sorted unix
+        seconds and values must not be nan (use for internally generated data)
+        - arrays that are already int64 / float64, sorted and without nan are
+        used without copying, so they must not be changed afterwards
+        """
+        series = cls([], timezone, temp_units)
+
+        if not trusted:
+            times, values = cls._check_arrays(times, values)
+        times = numpy.asarray(times, dtype=numpy.int64)
+        values = numpy.asarray(values, dtype=numpy.float64)
+        if len(times) != len(values):
+            raise Exception("timestamps and values must be the same length")
+
+        if trusted:
+            series._set_arrays(times, values)
+            return series
+
+        if len(times) and (times.max() > 9999999999): times = times // 1000
+
+        keep = ~numpy.isnan(values)
+        if not keep.all(): times, values = times[keep], values[keep]
+        series._set_arrays(times, values)
+
+        series._validate_series()
+        series._sort_series()
+        return series
+
+    @classmethod
+    def from_arrow(cls, table, timestamp_column='timestamp', value_column='value',
+                   timezone=None, temp_units='F', start_at=None, end_at=None):
+        """build a series from two columns of an arrow table (requires pyarrow)"""
+        timezone = cls._timezone(timezone)
+        times, values = columnar.read_arrow(table, timestamp_column, value_column,
+                                            timezone, start_at, end_at)
+        return cls.from_arrays(times, values, timezone, temp_units)
+
+    @classmethod
+    def from_pandas(cls, data, value_column=None, timestamp_column=None,
+                    timezone=None, temp_units='F'):
+        """build a series from a pandas Series or DataFrame (requires pandas)
+        - timestamps are taken from the DatetimeIndex (or timestamp_column);
+        tz aware times are used as is, naive times are read as local wall
+        clock time in timezone
+        - the values are not copied if they are float64 and already sorted, so
+        the pandas data must not be changed afterwards (pass a copy otherwise)
+        """
+        timezone = cls._timezone(timezone)
+        times, values = columnar.read_pandas(data, value_column, timestamp_column, timezone)
+        return cls.from_arrays(times, values, timezone, temp_units)
+
+    @classmethod
+    def from_parquet(cls, filename, timestamp_column='timestamp', value_column='value',
+                     timezone=None, temp_units='F', start_at=None, end_at=None):
+        """build a series from two columns of a parquet file (requires pyarrow)
+        - only the timestamp and value columns are read
+        - row groups outside of start_at / end_at are skipped
+        """
+        timezone = cls._timezone(timezone)
+        times, values = columnar.read_parquet(filename, timestamp_column, value_column,
+                                              timezone, start_at, end_at)
+        return cls.from_arrays(times, values, timezone, temp_units)
+
+    @classmethod
+    def from_store(cls, store, meter_id, start_at=None, end_at=None, temp_units='F'):
+        """build a series from the readings of one meter in a MeterStore; only
+        the readings between start_at and end_at are read
+        """
+        return store.series(meter_id, start_at, end_at, temp_units)
+
+    @staticmethod
+    def _timezone(timezone):
+        if isinstance(timezone, str) | (timezone == None):
+            return utils.get_timezone(timezone)
+        return timezone
+
+    # --- storage --- #
+    @property
+    def series(self):
+        """the series as a list of (timestamp, value) tuples"""
+        return zip(self._times.tolist(), self._values.tolist())
+
+    @series.setter
+    def series(self, data):
+        if len(data) == 0:
+            times, values = [], []
+        else:
+            times, values = zip(*data)
+
+        self._set_arrays(numpy.array(times, dtype=numpy.int64),
+                         numpy.array(values, dtype=numpy.float64))
+
+    def _set_arrays(self, times, values):
+        self._times = times
+        self._values = values
+        self._time_buffer = None
+        self._value_buffer = None
+        self._shared_file = None
+        self._shared_owner = False
+        self._data_version += 1
+
+    def arrays(self):
+        """timestamps (int64 unix seconds) and values (float64) as numpy arrays"""
+        return self._times, self._values
+
+    # --- appending --- #
+    def append(self, data, duplicates='last'):
+        """add readings to the series
+        - data may be a list of (timestamp, value) tuples or another Series
+        - readings that are all newer than the end of the series are copied
+        onto the end in place (amortized O(k))
+        - anything else is merged in (O(n+k)); readings that share a timestamp
+        are combined according to duplicates: 'first', 'last' or 'mean'
+        """
+        if duplicates not in ('first', 'last', 'mean'):
+            raise Exception("duplicates must be one of 'first', 'last' or 'mean'")
+        if self._shared_file != None:
+            raise Exception("shared series are read-only, call release_memory() first")
+
+        if isinstance(data, Series):
+            times, values = data.arrays()
+        else:
+            times, values = self._to_arrays(self.load_list(data))
+        if len(times) == 0: return self
+
+        if (times.max() > 9999999999) | (times.min() < -999999999):
+            raise Exception("timestamps must be in seconds since unix epoch")
+        if not (times[1:] >= times[:-1]).all():
+            order = numpy.argsort(times, kind='mergesort')
+            times, values = times[order], values[order]
+
+        newer = (len(self._times) == 0) or (times[0] > self._times[-1])
+        if newer and (times[1:] > times[:-1]).all():
+            self._append_in_place(times, values)
+        else:
+            self._merge(times, values, duplicates)
+        return self
+
+    def extend(self, other, duplicates='last'):
+        """add the readings of another series, see append"""
+        return self.append(other, duplicates=duplicates)
+
+    def _append_in_place(self, times, values):
+        n, k = len(self._times), len(times)
+        growable = (self._time_buffer is not None) and (self._times.base is self._time_buffer)
+        if (not growable) or (len(self._time_buffer) < n + k):
+            capacity = max(n + k, 2 * n, 64)
+            time_buffer = numpy.empty(capacity, dtype=numpy.int64)
+            value_buffer = numpy.empty(capacity, dtype=numpy.float64)
+            time_buffer[:n] = self._times
+            value_buffer[:n] = self._values
+        else:
+            time_buffer, value_buffer = self._time_buffer, self._value_buffer
+
+        time_buffer[n:n+k] = times
+        value_buffer[n:n+k] = values
+        self._set_arrays(time_buffer[:n+k], value_buffer[:n+k])
+        self._time_buffer, self._value_buffer = time_buffer, value_buffer
+
+    def _merge(self, times, values, duplicates):
+        """merge sorted readings into the series; existing readings come
+        before new ones that share their timestamp
+        """
+        n, k = len(self._times), len(times)
+        positions = numpy.searchsorted(self._times, times, side='right') + numpy.arange(k)
+        is_new = numpy.zeros(n + k, dtype=bool)
+        is_new[positions] = True
+
+        merged_times = numpy.empty(n + k, dtype=numpy.int64)
+        merged_values = numpy.empty(n + k, dtype=numpy.float64)
+        merged_times[is_new], merged_values[is_new] = times, values
+        merged_times[~is_new], merged_values[~is_new] = self._times, self._values
+
+        starts = numpy.flatnonzero(numpy.r_[True, merged_times[1:] != merged_times[:-1]])
+        if len(starts) < n + k:
+            if duplicates == 'first':
+                merged_values = merged_values[starts]
+            elif duplicates == 'last':
+                merged_values = merged_values[numpy.r_[starts[1:], n + k] - 1]
+            else:
+                counts = numpy.diff(numpy.r_[starts, n + k])
+                merged_values = numpy.add.reduceat(merged_values, starts) / counts
+            merged_times = merged_times[starts]
+
+        self._set_arrays(merged_times, merged_values)
+
     # --- accessors --- #
     def data(self, start_at=None, end_at=None, step_size=None, exclude=True):
         """raw data accessors, returns a list of tuples
@@ -76,7 +289,8 @@ class Series(object):
         exclusion periods is returned
         - if a step_size argument is present, data will be interpolated first
         """
-        data = self.series
+        times, values = self._times, self._values
+        if len(times) == 0: return []
         
         # capture start_at / end_at
         if (start_at != None) & (end_at != None):
@@ -85,43 +299,112 @@ class Series(object):
             end_at = utils.read_timestamp(end_at, self.timezone)
         else:
             slice_data = False
-            start_at    = data[0][0]
-            end_at      = data[-1][0]
+            start_at    = int(times[0])
+            end_at      = int(times[-1])
 
         # if step_size is specified, interpolate
         if step_size != None:
-            output_values = numpy.arange(start_at, (end_at + 1), step_size)
-            x_values, y_values = zip(*data)
-
-            interp_vals = numpy.interp(output_values, x_values, y_values)
-            data = zip(output_values, interp_vals)
-            data = [(e[0], round(e[1], 2)) for e in data]
+            output_times = numpy.arange(start_at, (end_at + 1), step_size)
+            values = numpy.round(numpy.interp(output_times, times, values), 2)
+            times = output_times
 
         # if start_at / end_at were specified, slice data
+        keep = numpy.ones(len(times), dtype=bool)
         if slice_data == True:
-            data = self._slice(list(data), start_at, end_at)
+            keep &= self._slice(times, start_at, end_at)
 
         # add in exclusions
         if exclude:
             for exclusion in self.exclusions:
-                data = self._exclude(list(data), exclusion)
+                keep &= self._exclude(times, exclusion)
 
-        return data
+        return zip(times[keep].tolist(), values[keep].tolist())
 
     def values(self):
-        return [e[1] for e in self.series]
+        return self._values.tolist()
     
     def sum(self):
-        return sum(self.values())
+        return float(self._values.sum())
 
     def average(self):
-        return self.sum() / len(self.series)
+        return self.sum() / len(self._values)
+
+    def energy_between(self, start_at, end_at):
+        """kWh used between start_at and end_at, for a series of kW readings
+        - each reading is the mean power over the interval that ends at its
+        timestamp, with every interval the median spacing of the readings (as
+        in diff.R), cut short where the previous reading is closer; missing
+        values are interpolated
+        - partial intervals are prorated; gaps between intervals and time
+        outside of the series count for nothing
+        - O(log n), using a cumulative energy index that is built on first use
+        and rebuilt after the series changes
+        """
+        knots, cumulative, _ = self._cumulative_energy()
+        if len(knots) == 0: return 0.0
+
+        start_at = utils.read_timestamp(start_at, self.timezone)
+        end_at = utils.read_timestamp(end_at, self.timezone)
+        energy = numpy.interp([start_at, end_at], knots, cumulative)
+        return float(energy[1] - energy[0])
+
+    def mean_power_between(self, start_at, end_at):
+        """mean kW between start_at and end_at (over the part of that period
+        covered by the intervals of the readings), see energy_between; nan if
+        none of it is covered
+        """
+        knots, cumulative, seconds = self._cumulative_energy()
+        if len(knots) == 0: return numpy.nan
+
+        start_at = utils.read_timestamp(start_at, self.timezone)
+        end_at = utils.read_timestamp(end_at, self.timezone)
+        covered = numpy.interp([start_at, end_at], knots, seconds)
+        covered = covered[1] - covered[0]
+        if covered <= 0: return numpy.nan
+        return self.energy_between(start_at, end_at) / (covered / 3600.0)
+
+    def _cumulative_energy(self):
+        """(knots, kWh used by each knot, seconds covered by each knot): the
+        start and the end of each reading's interval, so that both stay flat
+        across gaps
+        """
+        if (self._energy_index != None) and (self._energy_index[0] == self._data_version):
+            return self._energy_index[1]
+
+        times, values = self._times, self._values
+        valid = ~numpy.isnan(values)
+        if valid.sum() == 0:
+            index = (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0), numpy.zeros(0))
+        else:
+            if not valid.all():
+                values = numpy.interp(times, times[valid], values[valid])
+            length = numpy.median(numpy.diff(times)) if len(times) > 1 else 0
+            starts = times - length
+            starts[1:] = numpy.maximum(starts[1:], times[:-1])
+            seconds = numpy.cumsum(times - starts)
+            cumulative = numpy.cumsum(values * (times - starts)) / 3600.0
+
+            # knots alternate start, end, start, end...; each start carries the
+            # totals of the previous end
+            knots = numpy.column_stack((starts, times)).ravel()
+            cumulative = numpy.column_stack((numpy.r_[0, cumulative[:-1]], cumulative)).ravel()
+            seconds = numpy.column_stack((numpy.r_[0, seconds[:-1]], seconds)).ravel()
+            index = (knots, cumulative, seconds)
+
+        self._energy_index = (self._data_version, index)
+        return index
 
     def start_at(self):
-        return self.series[0][0]
+        return int(self._times[0])
 
     def end_at(self):
-        return self.series[-1][0]
+        return int(self._times[-1])
+
+    def calendar(self, holidays=None):
+        """calendar features (time of week, hour, month, weekend, holiday...)
+        of the series timestamps, see calendar_features.py
+        """
+        return calendar_features.features(self._times, self.timezone, holidays)
 
     # --- convenience methods --- #        
     def is_farenheit(self):
@@ -160,10 +443,25 @@ class Series(object):
             
     def load_list_from_csv(self, filename):
         """load CSV data from file"""
-        with open(filename, 'r') as f:
-            csv_data = [(e[0], e[self.data_column]) for e in csv.reader(f) if e]
-        
-        return self.load_list(csv_data)
+        times, values = self._read_csv(filename)
+        return zip(times.tolist(), values.tolist())
+
+    def _read_csv(self, filename):
+        """timestamp and value arrays from a csv file (rows without a value dropped)"""
+        times, values = read_csv_columns(filename, [self.data_column], self.timezone)
+        keep = ~numpy.isnan(values[0])
+        return times[keep], values[0][keep]
+
+    def _to_arrays(self, data):
+        if len(data) == 0:
+            return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.float64)
+        times, values = zip(*data)
+        return numpy.array(times, dtype=numpy.int64), numpy.array(values, dtype=numpy.float64)
+
+    @staticmethod
+    def _float_or_nan(value):
+        try: return float(value)
+        except: return float('nan')
 
     # --- file writers --- #            
     def write_to_file(self, file_obj=None, file_name='series.csv',
@@ -178,14 +476,67 @@ class Series(object):
         return file_obj
 
     def write_to_tempfile(self, start_at=None, end_at=None, exclude=True):
+        """write the series to a temporary file
+        - the file is reused by later calls for the same window until the
+        series data, or (if exclude is True) the exclusions, change
+        - only the latest file per exclude flag is kept, so a series written
+        over many windows does not hold on to a file for each of them
+        """
+        key = (start_at, end_at, self._data_version,
+               self._exclusion_version if exclude else None)
+
+        cached = self._tempfiles.get(exclude)
+        if (cached != None) and (cached[0] == key): return cached[1]
+
         tmp_file = tempfile.NamedTemporaryFile()
-        return self.write_to_file(tmp_file, start_at=start_at, end_at=end_at, exclude=exclude)
+        self.write_to_file(tmp_file, start_at=start_at, end_at=end_at, exclude=exclude)
+        self._tempfiles[exclude] = (key, tmp_file)
+        return tmp_file
+
+    def fingerprint(self, exclude=True):
+        """sha1 hex digest of the timestamps, values, timezone and units (and, if
+        exclude is True, the exclusions), ex: for result cache keys
+        - recomputed only after the series data or exclusions change
+        """
+        version = (self._data_version, self._exclusion_version if exclude else None)
+
+        cached = self._fingerprints.get(exclude)
+        if (cached != None) and (cached[0] == version): return cached[1]
+
+        digest = hashlib.sha1("%s,%s" % (self.timezone, self.temp_units))
+        digest.update(self._times.astype(numpy.int64).tobytes())
+        digest.update(self._values.astype(numpy.float64).tobytes())
+        if exclude: digest.update(repr(self.exclusions))
+
+        self._fingerprints[exclude] = (version, digest.hexdigest())
+        return self._fingerprints[exclude][1]
+
+    def to_arrow(self, value_column='value'):
+        """arrow table with a timestamp column and a value column (requires pyarrow)"""
+        return columnar.to_arrow([(value_column, self)], self.timezone)
+
+    def to_pandas(self, name='value'):
+        """pandas Series with a tz aware DatetimeIndex (requires pandas)
+        - the pandas values share memory with this series (no copy) and are
+        read-only, since changes would not be seen by the fingerprint and
+        tempfile caches; use .copy() for a writeable copy
+        """
+        pd = columnar.import_pandas()
+        return pd.Series(columnar.read_only(self._values),
+                         index=columnar.to_pandas_index(self._times, self.timezone),
+                         name=name, copy=False)
+
+    def to_parquet(self, filename, value_column='value', **kwargs):
+        """write the series to a parquet file (requires pyarrow)"""
+        return columnar.write_parquet(filename, [(value_column, self)],
+                                      self.timezone, **kwargs)
 
     # --- exclusion periods --- #
     def add_exclusion(self, exclusion_start, exclusion_end):
         exclusion_start = utils.read_timestamp(exclusion_start, self.timezone)
         exclusion_end = utils.read_timestamp(exclusion_end, self.timezone)
         self.exclusions.append( (exclusion_start, exclusion_end) )
+        self._exclusion_version += 1
         return True
     
     def add_named_exclusion(self, exclusion_name):
@@ -203,57 +554,168 @@ class Series(object):
 
     def clear_exclusions(self):
         self.exclusions = []
+        self._exclusion_version += 1
 
-    def _exclude(self, data, exclusion):
-        """exclude an exclusion period
+    def _exclude(self, times, exclusion):
+        """mask of the times outside of an exclusion period
             - assumes exclusion timestamps already converted to unix
-            - pretty unintelligent, should be optimized
         """
-        return [e for e in data if (e[0] < exclusion[0]) | (e[0] > exclusion[1])]
+        return (times < exclusion[0]) | (times > exclusion[1])
     
-    def _slice(self, data, start_at, end_at):
-        """slice data to only include entries between start_at and end_at"""
-        return [e for e in data if (e[0] >= start_at) & (e[0] <= end_at)]
+    def _slice(self, times, start_at, end_at):
+        """mask of the times between start_at and end_at"""
+        return (times >= start_at) & (times <= end_at)
+
+    # --- shared memory / pickling --- #
+    def share_memory(self, directory=None):
+        """move the series data into a memory mapped file so that other
+        processes can attach to it without copying or re-parsing
+        - a shared series pickles as a reference to the file, so passing it
+        (or a Loadshape that holds it) to multiprocessing workers is cheap
+        - shared data is read-only; call release_memory() in the process that
+        shared the series once the workers are done with it
+        """
+        if self._shared_file != None: return self._shared_file
+
+        if directory == None: directory = SHARED_MEMORY_DIR
+        fd, shared_file = tempfile.mkstemp(prefix='loadshape-', suffix='.series',
+                                           dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self._times.astype(numpy.int64).tobytes())
+            f.write(self._values.astype(numpy.float64).tobytes())
+
+        self._shared_owner = True
+        self._attach(shared_file, len(self._times))
+        return shared_file
+
+    def release_memory(self):
+        """copy shared data back into process memory and, if this process
+        shared the series, remove the shared file
+        """
+        if self._shared_file == None: return
+
+        shared_file, owner = self._shared_file, self._shared_owner
+        self._times = numpy.array(self._times)
+        self._values = numpy.array(self._values)
+        self._shared_file = None
+        self._shared_owner = False
+
+        if owner and os.path.exists(shared_file): os.remove(shared_file)
+
+    def _attach(self, shared_file, length):
+        self._shared_file = shared_file
+        if length == 0:
+            self._times = numpy.zeros(0, dtype=numpy.int64)
+            self._values = numpy.zeros(0, dtype=numpy.float64)
+            return
+
+        self._times = numpy.memmap(shared_file, dtype=numpy.int64, mode='r',
+                                   shape=(length,))
+        self._values = numpy.memmap(shared_file, dtype=numpy.float64, mode='r',
+                                    offset=(length * 8), shape=(length,))
+
+    def __getstate__(self):
+        """series data is pickled as raw buffers, or as a reference to the
+        shared file if the series has been shared
+        """
+        state = self.__dict__.copy()
+        length = len(self._times)
+        if self._shared_file != None:
+            state['_times'] = None
+            state['_values'] = None
+        else:
+            state['_times'] = self._times.astype(numpy.int64).tobytes()
+            state['_values'] = self._values.astype(numpy.float64).tobytes()
+
+        state['_length'] = length
+        state['_shared_owner'] = False
+        state['_tempfiles'] = {}
+        state['_energy_index'] = None
+        state['_time_buffer'] = None
+        state['_value_buffer'] = None
+        return state
+
+    def __setstate__(self, state):
+        length = state.pop('_length')
+        self.__dict__.update(state)
+        if self._shared_file != None:
+            self._attach(self._shared_file, length)
+        else:
+            self._times = numpy.frombuffer(state['_times'], dtype=numpy.int64).copy()
+            self._values = numpy.frombuffer(state['_values'], dtype=numpy.float64).copy()
         
     # --- series sorter --- #
     def _sort_series(self):
-        """sort series data by time
-            - this is pretty inefficient should probably change this out
-        """
-        self.series.sort(key=lambda e: e[0])
+        """sort series data by time (a no-op for data that is already in order)"""
+        if self._ordered(): return
+        order = numpy.argsort(self._times, kind='mergesort')
+        self._times = self._times[order]
+        self._values = self._values[order]
         
+    def _ordered(self):
+        return bool((self._times[1:] >= self._times[:-1]).all())
+
     # --- series validations --- #
-    def _validate_entry_is_tuple(self, entry):
-        if not isinstance(entry, tuple):
-            self.errors.append("input data must be a List of Tuples")
-    
-    def _validate_timestamp_is_int(self, timestamp):
-        if not isinstance(timestamp, int):
-            self.errors.append("first item in each tuple must be an integer timestamp")
-            
-    def _validate_timestamp_format(self, timestamp):
-        if len(str(timestamp)) > 10:
-             self.errors.append("timestamps must be in seconds since unix epoch")
-    
-    def _validate_value_numberness(self, value):
-        if (not isinstance(value, int)) & (not isinstance(value, float)) & (value != None):
-            self.errors.append("values must be either ints, floats, or None")
+    @staticmethod
+    def _check_arrays(times, values):
+        """raw from_arrays input, checked before it is converted to int64 /
+        float64 (which would truncate fractional timestamps):
+            - timestamps must be integers (integral floats are accepted)
+            - values must be numbers (nan for missing values)
+        """
+        times = numpy.asarray(times)
+        if len(times) and (times.dtype.kind not in 'iu'):
+            if times.dtype.kind != 'f' or not numpy.array_equal(times, numpy.floor(times)):
+                raise Exception("first item in each tuple must be an integer timestamp")
+
+        values = numpy.asarray(values)
+        if len(values) and (values.dtype.kind not in 'iuf'):
+            try: values = values.astype(numpy.float64)
+            except (TypeError, ValueError):
+                raise Exception("values must be either ints, floats, or None")
+        return times, values
 
     def _validate_series(self, exception=True):
-        '''series validation:
-            - should be a list of tuples
-            - timestamps must be ints
+        '''series validation, done on the whole arrays at once (timestamps and
+        values are already int64 / float64 arrays, see _check_arrays):
             - timestamps must be unix seconds since epoch
-            - values must be floats or ints
         '''
         self.errors = []
-        
-        for entry in self.series:
-            self._validate_entry_is_tuple(entry)            
-            self._validate_timestamp_is_int(entry[0])
-            self._validate_timestamp_format(entry[0])
-            self._validate_value_numberness(entry[1])
-            if len(self.errors) > 0: break
-        
-        if exception & len(self.errors) != 0: raise Exception(self.errors[0])
+        times = self._times
+
+        if len(times) and ((times.max() > 9999999999) | (times.min() < -999999999)):
+            self.errors.append("timestamps must be in seconds since unix epoch")
+
+        if exception and (len(self.errors) != 0): raise Exception(self.errors[0])
         return True if len(self.errors) == 0 else False
+
+def read_csv_columns(filename, columns, timezone):
+    """timestamps (first column) and the given value columns of a csv file,
+    in one pass over the file
+    - returns an int64 array of timestamps and a float64 array with one row per
+    requested column; values that are missing or not numbers are nan
+    - files with YYYY-MM-DD HH:MM:SS timestamps (such as the R script outputs)
+    are converted as whole columns, other timestamps one at a time
+    """
+    with open(filename, 'r') as f:
+        rows = [e for e in csv.reader(f) if e]
+    if len(rows) == 0:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros((len(columns), 0))
+
+    stamps = [row[0] for row in rows]
+    if all((len(stamp) == 19) and (stamp[4] == '-') for stamp in stamps):
+        wall = numpy.array(stamps, dtype='datetime64[s]').astype(numpy.int64)
+        times = columnar._localize(wall, timezone)
+    else:
+        times = numpy.array([utils.read_timestamp(stamp, timezone) for stamp in stamps],
+                            dtype=numpy.int64)
+
+    values = numpy.empty((len(columns), len(rows)), dtype=numpy.float64)
+    for i, column in enumerate(columns):
+        raw = [row[column] for row in rows]
+        try:
+            values[i] = numpy.array(raw, dtype=numpy.float64)
+        except ValueError:
+            values[i] = [Series._float_or_nan(v) for v in raw]
+
+    return times, values
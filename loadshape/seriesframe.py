@@ -0,0 +1,164 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import numpy
+
+import utils
+import columnar
+
+from series import Series, read_csv_columns
+
+class SeriesFrame(object):
+
+    def __init__(self, times, columns, timezone=None, temp_units='F'):
+        """several aligned value columns over one shared timestamp array
+        - times: sorted unix timestamps (seconds)
+        - columns: list of (name, values) pairs, each as long as times; nan
+        marks a missing value
+        - frame[name] (or frame[position]) is a Series; columns without missing
+        values share the frame's buffers instead of copying them
+        - iterating a frame yields its columns as Series in order, so results
+        can still be unpacked like the tuples they replace:
+            kw_diff, kw_base, cumulative_kwh_diff, cumulative_kwh_base = l.diff()
+        """
+        self.timezone   = Series._timezone(timezone)
+        self.temp_units = temp_units
+        self.times      = numpy.asarray(times, dtype=numpy.int64)
+        self.names      = [name for name, values in columns]
+
+        self.values = numpy.empty((len(columns), len(self.times)), dtype=numpy.float64)
+        for i, (name, values) in enumerate(columns):
+            self.values[i] = values
+        self._series = {}
+
+    @classmethod
+    def from_csv(cls, filename, names, timezone=None, temp_units='F'):
+        """frame from a csv of timestamp,value,value,... rows (ex: the R outputs),
+        parsed once; names label the value columns in order
+        """
+        timezone = Series._timezone(timezone)
+        times, values = read_csv_columns(filename, range(1, len(names) + 1), timezone)
+        return cls(times, zip(names, values), timezone, temp_units)
+
+    # --- column access --- #
+    def column(self, name):
+        """values of one column as an array (a view, nan where missing)"""
+        return self.values[self._position(name)]
+
+    def __getitem__(self, key):
+        position = self._position(key)
+        if position not in self._series:
+            values = self.values[position]
+            keep = ~numpy.isnan(values)
+            if keep.all():
+                times = self.times
+            else:
+                times, values = self.times[keep], values[keep]
+            self._series[position] = Series.from_arrays(times, values, self.timezone,
+                                                        self.temp_units, trusted=True)
+        return self._series[position]
+
+    def __iter__(self):
+        for position in range(len(self.names)):
+            yield self[position]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def keys(self):
+        return list(self.names)
+
+    def items(self):
+        """(name, Series) pairs, ex: for Loadshape.write_parquet"""
+        return [(name, self[name]) for name in self.names]
+
+    def _position(self, key):
+        if isinstance(key, int):
+            if not (-len(self.names) <= key < len(self.names)):
+                raise IndexError("frame has %s columns" % len(self.names))
+            return key % len(self.names)
+        if key not in self.names: raise KeyError(key)
+        return self.names.index(key)
+
+    @classmethod
+    def from_pandas(cls, data, timezone=None, temp_units='F'):
+        """frame from a pandas DataFrame with a DatetimeIndex (requires pandas);
+        every column becomes a frame column
+        """
+        timezone = Series._timezone(timezone)
+        times = columnar._pandas_seconds(data.index, timezone, columnar.import_pandas())
+        order = numpy.argsort(times, kind='mergesort')
+        columns = [(name, numpy.asarray(data[name].values, dtype=numpy.float64)[order])
+                   for name in data.columns]
+        return cls(times[order], columns, timezone, temp_units)
+
+    # --- output --- #
+    def write_to_file(self, file_obj=None, file_name='frame.csv'):
+        """write timestamp,value,value,... rows (the layout from_csv reads);
+        missing values are written as NA
+        """
+        if file_obj == None: file_obj = open(file_name, 'w')
+
+        for time, row in zip(self.times, self.values.T):
+            time = utils.int_to_datetime(int(time), self.timezone).strftime("%Y-%m-%d %H:%M:%S")
+            row = ["NA" if numpy.isnan(v) else repr(float(v)) for v in row]
+            file_obj.write("%s,%s\n" % (time, ",".join(row)))
+
+        file_obj.flush()
+        return file_obj
+
+    def to_pandas(self):
+        """pandas DataFrame with a tz aware DatetimeIndex and one column per
+        frame column (requires pandas); the DataFrame shares the frame's
+        values instead of copying them, read-only (see Series.to_pandas)
+        """
+        pd = columnar.import_pandas()
+        return pd.DataFrame(columnar.read_only(self.values).T,
+                            index=columnar.to_pandas_index(self.times, self.timezone),
+                            columns=self.names, copy=False)
+
+    def to_arrow(self):
+        """arrow table with a timestamp column and one column per value column (requires pyarrow)"""
+        return columnar.to_arrow(self.items(), self.timezone)
+
+    def to_parquet(self, filename, **kwargs):
+        """write the frame to a parquet file (requires pyarrow)"""
+        return columnar.write_parquet(filename, self.items(), self.timezone, **kwargs)
+
+    def __repr__(self):
+        return "SeriesFrame(%s rows: %s)" % (len(self.times), ", ".join(self.names))
@@ -0,0 +1,444 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+"""long-running baseline prediction service
+
+    python -m loadshape.serve --port 8642
+    python -m loadshape.serve --socket /var/run/loadshape.sock
+
+Parsed input data and fitted baselines are kept in memory, keyed by building,
+so queries do not rebuild a Loadshape. Baseline queries are answered from the
+fitted baseline, but the first diff or event_performance query for each set of
+parameters still runs the R script; only repeated queries are answered from
+the per-building result cache without it.
+
+    PUT    /buildings/<id>                      load data and fit the baseline
+    GET    /buildings/<id>/baseline             ?start_at=&end_at=&step_size=
+    GET    /buildings/<id>/diff                 ?start_at=&end_at=&step_size=
+    GET    /buildings/<id>/event_performance    ?start_at=&end_at=
+    POST   /buildings/<id>/refit                refit in the background
+    DELETE /buildings/<id>
+    GET    /status
+
+The PUT body is a JSON object with the Loadshape arguments (load_data,
+temp_data, forecast_temp_data, timezone, temp_units, sq_ft) and an optional
+"baseline" object with the baseline arguments (weighting_days,
+modeling_interval, step_size, start_at, end_at).
+"""
+
+import os
+import json
+import time
+import urlparse
+import logging
+import argparse
+import threading
+import scheduler
+import SocketServer
+import BaseHTTPServer
+
+from collections import OrderedDict
+from loadshape import Loadshape
+
+LOADSHAPE_ARGS = ['load_data', 'temp_data', 'forecast_temp_data',
+                  'timezone', 'temp_units', 'sq_ft']
+BASELINE_ARGS = ['start_at', 'end_at', 'weighting_days', 'modeling_interval',
+                 'step_size']
+
+class BadRequest(Exception):
+    """invalid request parameters or body, answered with a 400"""
+
+class BuildingCache(object):
+
+    def __init__(self, max_buildings=100, idle_seconds=3600):
+        """least-recently-used store of resident buildings
+        - at most max_buildings are kept in memory
+        - buildings that have not been queried for idle_seconds are evicted
+        """
+        self.max_buildings  = max_buildings
+        self.idle_seconds   = idle_seconds
+        self.entries        = OrderedDict()
+        self.lock           = threading.Lock()
+
+    def get(self, building_id):
+        with self.lock:
+            entry = self.entries.pop(building_id, None)
+            if entry == None: return None
+            entry.last_access = time.time()
+            self.entries[building_id] = entry
+            return entry
+
+    def put(self, building_id, entry):
+        with self.lock:
+            self.entries.pop(building_id, None)
+            entry.last_access = time.time()
+            self.entries[building_id] = entry
+            while len(self.entries) > self.max_buildings:
+                self.entries.popitem(last=False)
+
+    def remove(self, building_id):
+        with self.lock:
+            return self.entries.pop(building_id, None) != None
+
+    def evict_idle(self, now=None):
+        if now == None: now = time.time()
+        with self.lock:
+            idle = [k for k, e in self.entries.iteritems()
+                    if (now - e.last_access) > self.idle_seconds]
+            for building_id in idle: del self.entries[building_id]
+        return idle
+
+    def building_ids(self):
+        with self.lock:
+            return self.entries.keys()
+
+    def snapshot(self):
+        """(building id, building) pairs, least recently used first"""
+        with self.lock:
+            return self.entries.items()
+
+class Building(object):
+
+    def __init__(self, loadshape, baseline_args=None):
+        """a resident building: a fitted Loadshape plus memoized query results
+        - query results are cleared whenever the baseline is refit
+        """
+        self.loadshape      = loadshape
+        self.baseline_args  = baseline_args or {}
+        self.results        = {}
+        self.lock           = threading.RLock()
+        self.refitting      = False
+        self.fitted_at      = None
+        self.last_access    = time.time()
+        self.last_error     = None
+
+    def fit(self):
+        with self.lock:
+            self.loadshape.baseline(**self.baseline_args)
+            self.results = {}
+            self.fitted_at = time.time()
+
+    def query(self, kind, key, func):
+        """cached result of func; func runs outside of the lock (Loadshape is
+        safe to use from several threads), so slow queries do not hold up
+        other queries for the same building
+        """
+        with self.lock:
+            if (kind, key) in self.results: return self.results[(kind, key)]
+            results = self.results
+
+        result = func()
+        with self.lock:
+            # results from before a refit are not kept
+            if results is self.results: self.results[(kind, key)] = result
+        return result
+
+class BaselineService(object):
+
+    def __init__(self, max_buildings=100, idle_seconds=3600, log_level=logging.INFO):
+        logging.basicConfig(level=log_level)
+        self.logger     = logging.getLogger(__name__)
+        self.log_level  = log_level
+        self.buildings  = BuildingCache(max_buildings, idle_seconds)
+
+    # --- request dispatch --- #
+    def handle(self, method, request_path, params=None, body=None):
+        """dispatch a request, returns (http status, json-serializable payload)"""
+        params = params or {}
+        parts = [p for p in request_path.split('/') if p]
+
+        try:
+            if parts == ['status'] and method == 'GET':
+                return 200, self.status()
+
+            if (len(parts) < 2) or (parts[0] != 'buildings'):
+                return 404, {"error": "unknown resource: %s" % request_path}
+
+            building_id = parts[1]
+            action = parts[2] if len(parts) > 2 else None
+
+            if action == None and method in ('PUT', 'POST'):
+                return 201, self.load_building(building_id, body or {})
+            if action == None and method == 'DELETE':
+                found = self.buildings.remove(building_id)
+                return (200 if found else 404), {"removed": found}
+
+            building = self.buildings.get(building_id)
+            if building == None:
+                return 404, {"error": "unknown building: %s" % building_id}
+
+            if action == 'refit' and method == 'POST':
+                return 202, {"refitting": self.refit(building_id, building)}
+            if action == 'baseline' and method == 'GET':
+                return 200, self.baseline(building, params)
+            if action == 'diff' and method == 'GET':
+                return 200, self.diff(building, params)
+            if action == 'event_performance' and method == 'GET':
+                return 200, self.event_performance(building, params)
+
+            return 404, {"error": "unknown action: %s %s" % (method, request_path)}
+
+        except BadRequest, e:
+            return 400, {"error": str(e)}
+        except Exception, e:
+            self.logger.exception("request failed: %s %s" % (method, request_path))
+            return 500, {"error": str(e)}
+
+    # --- actions --- #
+    def load_building(self, building_id, spec, fit=True):
+        if not isinstance(spec, dict): raise BadRequest("building must be a JSON object")
+        unknown = sorted(set(spec) - set(LOADSHAPE_ARGS + ['baseline']))
+        if unknown: raise BadRequest("unknown building argument: %s" % unknown[0])
+        if not isinstance(spec.get('baseline', {}), dict):
+            raise BadRequest("baseline must be a JSON object")
+        unknown = sorted(set(spec.get('baseline', {})) - set(BASELINE_ARGS))
+        if unknown: raise BadRequest("unknown baseline argument: %s" % unknown[0])
+
+        kwargs = dict((k, spec[k]) for k in LOADSHAPE_ARGS if k in spec)
+        for k in ['load_data', 'temp_data', 'forecast_temp_data']:
+            if isinstance(kwargs.get(k), list):
+                kwargs[k] = [tuple(e) for e in kwargs[k]]
+            elif isinstance(kwargs.get(k), unicode):
+                kwargs[k] = str(kwargs[k])
+        if isinstance(kwargs.get('timezone'), unicode):
+            kwargs['timezone'] = str(kwargs['timezone'])
+
+        baseline_args = dict((str(k), v) for k, v in spec.get('baseline', {}).iteritems())
+
+        # errors in the input data are the client's
+        try: loadshape = Loadshape(log_level=self.log_level, **kwargs)
+        except Exception, e: raise BadRequest(str(e))
+        building = Building(loadshape, baseline_args)
+        if fit: building.fit()
+
+        self.buildings.put(building_id, building)
+        return {"building": building_id, "fitted_at": building.fitted_at}
+
+    def refit(self, building_id, building):
+        """refit a building's baseline in a background thread; queries keep
+        being answered from the previous fit until the new one is ready
+        """
+        with building.lock:
+            if building.refitting: return False
+            building.refitting = True
+
+        def run():
+            try:
+                fresh = Building(self._copy_loadshape(building.loadshape),
+                                 building.baseline_args)
+                fresh.fit()
+                with building.lock:
+                    building.loadshape  = fresh.loadshape
+                    building.results    = {}
+                    building.fitted_at  = fresh.fitted_at
+                    building.last_error = None
+            except Exception, e:
+                self.logger.exception("refit failed: %s" % building_id)
+                with building.lock: building.last_error = str(e)
+            finally:
+                with building.lock: building.refitting = False
+
+        thread = threading.Thread(target=run, name="refit-%s" % building_id)
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def baseline(self, building, params):
+        start_at, end_at = params.get('start_at'), params.get('end_at')
+        step_size = self._int_param(params, 'step_size')
+
+        def compute():
+            series = building.loadshape.baseline_series
+            if (start_at == None) | (end_at == None):
+                return series.data(step_size=step_size)
+            return series.data(start_at=start_at, end_at=end_at, step_size=step_size)
+
+        return {"baseline": building.query('baseline', (start_at, end_at, step_size), compute)}
+
+    def diff(self, building, params):
+        start_at, end_at = params.get('start_at'), params.get('end_at')
+        step_size = self._int_param(params, 'step_size') or 900
+
+        def compute():
+            diff_data = building.loadshape.diff(start_at, end_at, step_size=step_size)
+            return dict((n, s.data()) for n, s in diff_data.items())
+
+        return building.query('diff', (start_at, end_at, step_size), compute)
+
+    def event_performance(self, building, params):
+        start_at, end_at = params.get('start_at'), params.get('end_at')
+        compute = lambda: building.loadshape.event_performance(start_at, end_at)
+        return building.query('event_performance', (start_at, end_at), compute)
+
+    def status(self):
+        out = {}
+        for building_id, building in self.buildings.snapshot():
+            out[building_id] = {"fitted_at":     building.fitted_at,
+                                "last_access":   building.last_access,
+                                "refitting":     building.refitting,
+                                "last_error":    building.last_error,
+                                "cached_results": len(building.results)}
+        return {"buildings": out, "scheduler": scheduler.stats()}
+
+    def evict_idle(self):
+        for building_id in self.buildings.evict_idle():
+            self.logger.info("evicted idle building: %s" % building_id)
+
+    def _copy_loadshape(self, loadshape):
+        """new Loadshape sharing the (read-only) input series of an existing one"""
+        return Loadshape(loadshape.training_load_series,
+                         loadshape.training_temperature_series,
+                         loadshape.forecast_temperature_series,
+                         timezone=loadshape.timezone.zone,
+                         temp_units=loadshape.temp_units,
+                         sq_ft=loadshape.sq_ft,
+                         tariff=loadshape.tariff,
+                         log_level=self.log_level,
+                         cache_dir=loadshape.cache_dir,
+                         scheduler=loadshape.scheduler,
+                         result_cache=loadshape.result_cache)
+
+    def _int_param(self, params, name):
+        value = params.get(name)
+        if value == None: return None
+        try: return int(value)
+        except ValueError: raise BadRequest("%s must be an integer" % name)
+
+# ----- HTTP transport ----- #
+class ServiceRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self): self._dispatch('GET')
+    def do_PUT(self): self._dispatch('PUT')
+    def do_POST(self): self._dispatch('POST')
+    def do_DELETE(self): self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        url = urlparse.urlparse(self.path)
+        params = dict((k, v[-1]) for k, v in urlparse.parse_qs(url.query).iteritems())
+
+        body = None
+        length = int(self.headers.getheader('content-length') or 0)
+        if length > 0:
+            try: body = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self._respond(400, {"error": "request body must be JSON"})
+
+        status, payload = self.server.service.handle(method, url.path, params, body)
+        self._respond(status, payload)
+
+    def _respond(self, status, payload):
+        out = json.dumps(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def address_string(self):
+        # unix socket clients have no (host, port) address
+        if isinstance(self.client_address, tuple): return self.client_address[0]
+        return 'unix'
+
+    def log_message(self, format, *args):
+        self.server.service.logger.debug(format % args)
+
+class ThreadedHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+class ThreadedUnixHTTPServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service, host='127.0.0.1', port=8642, socket_path=None):
+    if socket_path != None:
+        if os.path.exists(socket_path): os.remove(socket_path)
+        server = ThreadedUnixHTTPServer(socket_path, ServiceRequestHandler)
+    else:
+        server = ThreadedHTTPServer((host, port), ServiceRequestHandler)
+
+    server.service = service
+    return server
+
+def start_evictor(service, interval=60):
+    def run():
+        while True:
+            time.sleep(interval)
+            service.evict_idle()
+
+    thread = threading.Thread(target=run, name="evictor")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="loadshape baseline prediction service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8642)
+    parser.add_argument("--socket", dest="socket_path", default=None,
+                        help="listen on a unix socket instead of localhost HTTP")
+    parser.add_argument("--max-buildings", type=int, default=100)
+    parser.add_argument("--idle-seconds", type=int, default=3600)
+    parser.add_argument("--max-r-processes", type=int, default=None,
+                        help="R scripts allowed to run at once (default: cpu count)")
+    parser.add_argument("--max-r-queue", type=int, default=None,
+                        help="R scripts allowed to wait for a slot before requests fail")
+    parser.add_argument("--r-timeout", type=float, default=None,
+                        help="seconds before a running R script is killed")
+    parser.add_argument("--r-memory-mb", type=int, default=None,
+                        help="address space limit for each R script")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    scheduler.configure(max_queue=args.max_r_queue, timeout=args.r_timeout,
+                        memory_limit=(args.r_memory_mb * 1024 * 1024) if args.r_memory_mb else None)
+    if args.max_r_processes: scheduler.configure(max_processes=args.max_r_processes)
+
+    service = BaselineService(max_buildings=args.max_buildings,
+                              idle_seconds=args.idle_seconds,
+                              log_level=getattr(logging, args.log_level.upper()))
+    server = make_server(service, args.host, args.port, args.socket_path)
+    start_evictor(service, interval=min(60, args.idle_seconds))
+
+    service.logger.info("serving on %s" % (args.socket_path or "%s:%s" % (args.host, args.port)))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket_path and os.path.exists(args.socket_path):
+            os.remove(args.socket_path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import numpy
+import utils
+import sqlite3
+
+from series import Series
+
+class MeterStore(object):
+
+    max_meters_per_query = 500
+
+    def __init__(self, filename, timezone=None):
+        """sqlite backed store of meter readings
+        - readings are stored as (meter_id, unix seconds, value) and indexed by
+        (meter_id, timestamp), so time range reads only touch the rows that are
+        requested
+        - meter ids are stored as text
+        - timezone is used to interpret string timestamps
+        """
+        if isinstance(timezone, str) | (timezone == None):
+            self.timezone = utils.get_timezone(timezone)
+        else:
+            self.timezone = timezone
+
+        self.filename   = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS readings (
+                                       meter_id     TEXT NOT NULL,
+                                       timestamp    INTEGER NOT NULL,
+                                       value        REAL,
+                                       PRIMARY KEY (meter_id, timestamp)
+                                   ) WITHOUT ROWID""")
+        self.connection.commit()
+
+    # --- ingestion --- #
+    def ingest(self, meter_id, data, batch_size=50000):
+        """add readings for a meter; existing readings at the same timestamps
+        are replaced
+        - data may be a list of (timestamp, value) tuples, a csv filename, or
+        a Series
+        - returns the number of readings written
+        """
+        meter_id = str(meter_id)
+        if isinstance(data, str): data = Series(data, self.timezone)
+        if isinstance(data, Series):
+            times, values = data.arrays()
+            rows = zip([meter_id] * len(times), times.tolist(), values.tolist())
+        else:
+            rows = [(meter_id, utils.read_timestamp(e[0], self.timezone), self._float(e[1]))
+                    for e in data]
+
+        sql = "INSERT OR REPLACE INTO readings (meter_id, timestamp, value) VALUES (?, ?, ?)"
+        with self.connection:
+            for i in range(0, len(rows), batch_size):
+                self.connection.executemany(sql, rows[i:i + batch_size])
+
+        return len(rows)
+
+    def delete(self, meter_id, start_at=None, end_at=None):
+        where, params = self._range_clause([meter_id], start_at, end_at)
+        with self.connection:
+            cursor = self.connection.execute("DELETE FROM readings WHERE %s" % where, params)
+        return cursor.rowcount
+
+    # --- queries --- #
+    def fetch(self, meter_id, start_at=None, end_at=None):
+        """timestamps and values (numpy arrays) for one meter, in time order"""
+        data = self.fetch_many([meter_id], start_at, end_at)
+        return data.get(str(meter_id), self._empty())
+
+    def fetch_many(self, meter_ids, start_at=None, end_at=None):
+        """timestamps and values for several meters, read with one query per
+        batch of meters
+        - returns a dict of meter_id: (timestamps, values)
+        """
+        meter_ids = list(meter_ids)
+        out = {}
+
+        # sqlite limits the number of parameters in one statement
+        for i in range(0, len(meter_ids), self.max_meters_per_query):
+            chunk = meter_ids[i:i + self.max_meters_per_query]
+            out.update(self._fetch_chunk(chunk, start_at, end_at))
+
+        return out
+
+    def _fetch_chunk(self, meter_ids, start_at, end_at):
+        where, params = self._range_clause(meter_ids, start_at, end_at)
+        rows = self.connection.execute("""SELECT meter_id, timestamp, value FROM readings
+                                          WHERE %s ORDER BY meter_id, timestamp""" % where,
+                                       params).fetchall()
+
+        out = {}
+        if len(rows) == 0: return out
+
+        ids, times, values = zip(*rows)
+        times = numpy.array(times, dtype=numpy.int64)
+        values = numpy.array([numpy.nan if v == None else v for v in values], dtype=numpy.float64)
+
+        # rows are ordered by meter, so each meter is one contiguous block
+        start = 0
+        for end in range(1, len(ids) + 1):
+            if (end == len(ids)) or (ids[end] != ids[start]):
+                out[ids[start]] = (times[start:end], values[start:end])
+                start = end
+
+        return out
+
+    def series(self, meter_id, start_at=None, end_at=None, temp_units='F'):
+        times, values = self.fetch(meter_id, start_at, end_at)
+        return Series.from_arrays(times, values, self.timezone, temp_units)
+
+    def series_many(self, meter_ids, start_at=None, end_at=None, temp_units='F'):
+        """dict of meter_id: Series, see fetch_many"""
+        data = self.fetch_many(meter_ids, start_at, end_at)
+        return dict((meter_id, Series.from_arrays(times, values, self.timezone, temp_units))
+                    for meter_id, (times, values) in data.iteritems())
+
+    def meter_ids(self):
+        rows = self.connection.execute("SELECT DISTINCT meter_id FROM readings ORDER BY meter_id")
+        return [r[0] for r in rows]
+
+    def extent(self, meter_id):
+        """first and last timestamp stored for a meter"""
+        return self.connection.execute("""SELECT MIN(timestamp), MAX(timestamp) FROM readings
+                                          WHERE meter_id = ?""", (meter_id,)).fetchone()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # --- helpers --- #
+    def _range_clause(self, meter_ids, start_at, end_at):
+        where = "meter_id IN (%s)" % ",".join(["?"] * len(meter_ids))
+        params = [str(m) for m in meter_ids]
+        if start_at != None:
+            where += " AND timestamp >= ?"
+            params.append(utils.read_timestamp(start_at, self.timezone))
+        if end_at != None:
+            where += " AND timestamp <= ?"
+            params.append(utils.read_timestamp(end_at, self.timezone))
+        return where, params
+
+    def _float(self, value):
+        try: return float(value)
+        except: return None
+
+    def _empty(self):
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.float64)
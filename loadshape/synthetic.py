@@ -0,0 +1,276 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+"""deterministic synthetic meter data for scale and stress tests
+
+    python -m loadshape.synthetic --meters 100 --days 365 --step 900 --store meters.db
+    python -m loadshape.synthetic --meters 1 --days 3650 --step 60 --out-dir data/
+
+--out-dir writes one csv per meter and a temperature.csv of hourly outdoor air
+temperatures; --store ingests the same, with the temperatures as meter
+"temperature".
+
+Loads follow a weekly occupied / unoccupied schedule in local time (so DST
+transitions and holidays show up as they do in real data), respond to
+outdoor air temperature, and carry noise. The same seed always produces the
+same data. messy() adds the problems real meter feeds have: gaps, duplicate
+readings and out of order readings.
+"""
+
+import os
+import numpy
+import argparse
+
+import utils
+import calendar_features
+
+from series import Series
+from store import MeterStore
+
+# days since the epoch of the warmest day of the year (about July 20th)
+WARMEST_DAY_OF_YEAR = 201
+
+def temperature(times, timezone, seed=0, mean=60.0, annual_swing=20.0,
+                daily_swing=10.0, weather_swing=6.0, noise=1.0):
+    """outdoor air temperature (F) at each timestamp
+    - an annual cycle (warmest late July), a daily cycle (warmest at 3PM local
+    time), a random offset for each day's weather, and noise
+    - the daily weather depends only on the seed and the date, so any slice of
+    a long period matches the same slice generated on its own
+    """
+    times = numpy.asarray(times, dtype=numpy.int64)
+    features = calendar_features.features(times, timezone)
+    local_hours = features.hour + (features.minute / 60.0)
+
+    day_of_year = features.days % 365.25
+    annual = numpy.cos(2 * numpy.pi * (day_of_year - WARMEST_DAY_OF_YEAR) / 365.25)
+    daily = numpy.cos(2 * numpy.pi * (local_hours - 15) / 24.0)
+
+    return (mean + (annual_swing * annual) + (daily_swing * daily)
+            + (weather_swing * _daily_noise(features.days, seed))
+            + (noise * _noise(times, seed + 1)))
+
+def load(times, temps, timezone, seed=0, base_kw=40.0, occupied_kw=60.0,
+         opens_at=8, closes_at=18, weekends=False, cooling_kw_per_degree=2.0,
+         heating_kw_per_degree=1.0, cooling_balance=65.0, heating_balance=50.0,
+         noise=0.05, holidays=None):
+    """building load (kW) at each timestamp
+    - occupied from opens_at to closes_at (local hours) on workdays (and on
+    weekends, if weekends is True), ramping up over the hour before opening
+    - above cooling_balance / below heating_balance (F) the load rises with
+    temperature, at a third of the rate while unoccupied
+    - noise is relative (0.05 is 5% of the load)
+    """
+    times = numpy.asarray(times, dtype=numpy.int64)
+    features = calendar_features.features(times, timezone, holidays)
+    local_hours = features.hour + (features.minute / 60.0)
+
+    open_days = numpy.ones(len(times), dtype=bool) if weekends else features.workday()
+    occupancy = numpy.clip(local_hours - (opens_at - 1), 0, 1)
+    occupancy[(local_hours >= closes_at) | ~open_days] = 0
+
+    response = 1.0 / 3 + (2.0 / 3 * occupancy)
+    cooling = numpy.maximum(temps - cooling_balance, 0) * cooling_kw_per_degree
+    heating = numpy.maximum(heating_balance - temps, 0) * heating_kw_per_degree
+
+    kw = base_kw + (occupied_kw * occupancy) + (response * (cooling + heating))
+    return numpy.maximum(kw * (1 + (noise * _noise(times, seed + 2))), 0)
+
+def meter(start_at, end_at, step=900, timezone=None, seed=0, **shape):
+    """times, kw and temperature arrays for one meter at a fixed resolution
+    (step seconds, 1 to 3600); shape arguments are passed to load()
+    """
+    timezone = Series._timezone(timezone)
+    times = _times(start_at, end_at, step, timezone)
+    temps = temperature(times, timezone, seed)
+    return times, load(times, temps, timezone, seed, **shape), temps
+
+def chunks(start_at, end_at, step=900, timezone=None, seed=0, chunk_days=30, **shape):
+    """meter() in pieces of chunk_days, for periods too long to hold in memory
+    (decades of one second data); the pieces join up to exactly the data
+    meter() would produce
+    """
+    timezone = Series._timezone(timezone)
+    start_at = utils.read_timestamp(start_at, timezone)
+    end_at = utils.read_timestamp(end_at, timezone)
+    start_at += (-start_at) % step  # the first reading, as in meter()
+
+    chunk_seconds = max(int(chunk_days * 86400 // step), 1) * step
+    for chunk_start in range(start_at, end_at + 1, chunk_seconds):
+        chunk_end = min(chunk_start + chunk_seconds - step, end_at)
+        yield meter(chunk_start, chunk_end, step, timezone, seed, **shape)
+
+def meters(count, start_at, end_at, step=900, timezone=None, seed=0):
+    """(meter_id, times, kw, temps) for count meters, each with its own size,
+    schedule and temperature response (drawn from the seed); the meters share
+    one set of times and one temperature series, as buildings in one region do
+    """
+    timezone = Series._timezone(timezone)
+    times = _times(start_at, end_at, step, timezone)
+    temps = temperature(times, timezone, seed)
+
+    random = numpy.random.RandomState(seed)
+    for i in range(count):
+        shape = {'base_kw':                 random.uniform(5, 200),
+                 'opens_at':                random.randint(5, 10),
+                 'closes_at':               random.randint(16, 22),
+                 'weekends':                random.rand() < 0.2,
+                 'cooling_kw_per_degree':   random.uniform(0, 5),
+                 'heating_kw_per_degree':   random.uniform(0, 3)}
+        shape['occupied_kw'] = shape['base_kw'] * random.uniform(0.5, 3)
+
+        kw = load(times, temps, timezone, seed + i, **shape)
+        yield "meter-%05d" % i, times, kw, temps
+
+def messy(times, values, seed=0, gaps=0.01, max_gap=96, duplicates=0.001,
+          out_of_order=0.001):
+    """times and values with the problems of real meter feeds
+    - gaps: about this fraction of readings is missing, in outages of 1 to
+    max_gap readings
+    - duplicates: this fraction of readings is sent twice, the second time
+    with a slightly different value
+    - out_of_order: this fraction of readings is swapped with the next one
+    """
+    random = numpy.random.RandomState(seed)
+    times = numpy.asarray(times, dtype=numpy.int64)
+    values = numpy.asarray(values, dtype=numpy.float64)
+    n = len(times)
+
+    keep = numpy.ones(n, dtype=bool)
+    n_gaps = int(round(gaps * n * 2.0 / (max_gap + 1)))
+    for start, length in zip(random.randint(0, max(n, 1), n_gaps),
+                             random.randint(1, max_gap + 1, n_gaps)):
+        keep[start:start + length] = False
+    times, values = times[keep], values[keep]
+
+    # each repeated reading appears twice in a row
+    repeated = random.choice(len(times), int(duplicates * len(times)), replace=False)
+    index = numpy.sort(numpy.r_[numpy.arange(len(times)), repeated])
+    copies = numpy.r_[False, index[1:] == index[:-1]]
+    times, values = times[index], values[index]
+    values[copies] *= 1 + (0.01 * random.randn(copies.sum()))
+
+    swaps = random.choice(max(len(times) - 1, 1), int(out_of_order * len(times)), replace=False)
+    for i in swaps:
+        times[[i, i + 1]] = times[[i + 1, i]]
+        values[[i, i + 1]] = values[[i + 1, i]]
+
+    return times, values
+
+def write_csv(filename, times, values, timezone=None, precision=3):
+    """write timestamp,value rows in local wall clock time (the format of the
+    test fixtures); rows are written in the order given
+    - as in any wall clock file, the hour repeated when DST ends is ambiguous
+    when the file is read back
+    """
+    timezone = Series._timezone(timezone)
+    times = numpy.asarray(times, dtype=numpy.int64)
+    local = times + calendar_features.utc_offsets(times, timezone)
+    stamps = local.astype('datetime64[s]').astype(str)
+
+    with open(filename, 'w') as f:
+        for stamp, value in zip(stamps, numpy.round(values, precision).tolist()):
+            f.write("%s,%s\n" % (stamp.replace('T', ' '), value))
+
+# --- helpers --- #
+def _times(start_at, end_at, step, timezone):
+    if not (1 <= step <= 3600): raise Exception("step must be between 1 and 3600 seconds")
+    start_at = utils.read_timestamp(start_at, timezone)
+    end_at = utils.read_timestamp(end_at, timezone)
+    first = start_at + ((-start_at) % step)
+    return numpy.arange(first, end_at + 1, step, dtype=numpy.int64)
+
+def _noise(times, seed):
+    """standard normal noise that depends only on the seed and the timestamp"""
+    state = (times.astype(numpy.uint64) * numpy.uint64(2654435761)) ^ \
+            numpy.uint64((seed * 40503 + 12345) % (2 ** 32))
+    uniform = [_hash_uniform(state), _hash_uniform(state ^ numpy.uint64(0x5bd1e995))]
+    return numpy.sqrt(-2 * numpy.log(uniform[0])) * numpy.cos(2 * numpy.pi * uniform[1])
+
+def _daily_noise(days, seed):
+    """one standard normal draw per day, shared by every timestamp in the day"""
+    unique_days, index = numpy.unique(days, return_inverse=True)
+    return _noise(unique_days * 86400, seed + 7)[index]
+
+def _hash_uniform(state):
+    """uniform (0, 1] values from 64 bit integer states (splitmix64 finalizer)"""
+    state = state.copy()
+    with numpy.errstate(over='ignore'):
+        state ^= state >> numpy.uint64(30)
+        state *= numpy.uint64(0xbf58476d1ce4e5b9)
+        state ^= state >> numpy.uint64(27)
+        state *= numpy.uint64(0x94d049bb133111eb)
+        state ^= state >> numpy.uint64(31)
+    return ((state >> numpy.uint64(11)).astype(numpy.float64) + 1) / float(2 ** 53)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="write synthetic meter data")
+    parser.add_argument("--meters", type=int, default=1)
+    parser.add_argument("--start-at", default="2013-01-01 00:00:00")
+    parser.add_argument("--days", type=float, default=365)
+    parser.add_argument("--step", type=int, default=900, help="seconds between readings")
+    parser.add_argument("--timezone", default="America/Los_Angeles")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--messy", action="store_true",
+                        help="add gaps, duplicates and out of order readings")
+    parser.add_argument("--out-dir", default=None, help="write one csv per meter here")
+    parser.add_argument("--store", default=None, help="ingest the readings into a MeterStore")
+    args = parser.parse_args(argv)
+
+    timezone = utils.get_timezone(args.timezone)
+    start_at = utils.read_timestamp(args.start_at, timezone)
+    end_at = start_at + int(args.days * 86400) - args.step
+    store = MeterStore(args.store, timezone) if args.store else None
+
+    for meter_id, times, kw, temps in meters(args.meters, start_at, end_at, args.step,
+                                             timezone, args.seed):
+        if args.messy: times, kw = messy(times, kw, seed=args.seed)
+        if args.out_dir:
+            write_csv(os.path.join(args.out_dir, "%s.csv" % meter_id), times, kw, timezone)
+        if store:
+            store.ingest(meter_id, Series.from_arrays(times, kw, timezone))
+        print "%s: %s readings" % (meter_id, len(times))
+
+    # hourly outdoor air temperature shared by the meters
+    hourly = numpy.arange(start_at, end_at + 1, 3600)
+    hourly_temps = temperature(hourly, timezone, args.seed)
+    if args.out_dir:
+        write_csv(os.path.join(args.out_dir, "temperature.csv"), hourly, hourly_temps,
+                  timezone, precision=2)
+    if store:
+        store.ingest("temperature", Series.from_arrays(hourly, hourly_temps, timezone))
+        store.close()
+
+if __name__ == '__main__':
+    main()
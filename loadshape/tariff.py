@@ -35,8 +35,13 @@
 
 import csv
 import json
+import numpy
 import utils
+import hashlib
 import tempfile
+import calendar_features
+
+from StringIO import StringIO
 import logging
 
 class Tariff(object):
@@ -121,6 +126,52 @@ class Tariff(object):
         self.dr_periods.append( (period_start, period_end) )
         return True
 
+    def energy_prices(self, times):
+        """energy price ($/kWh) of the interval ending at each unix timestamp,
+        looked up as tariff.R does: the rate in effect one minute before the
+        timestamp, on the dr day schedule within a dr period, else on the
+        weekend schedule on Saturdays and Sundays, else on the weekday schedule
+        - energy rates only: as in tariff.R, demand charges are not priced
+        """
+        times = numpy.asarray(times, dtype=numpy.int64)
+        features = calendar_features.CalendarFeatures(times - 60, self.timezone)
+
+        def periods(schedule):
+            table = numpy.array([[int(c) for c in month] for month in schedule])
+            return table[features.month - 1, features.hour]
+
+        period = periods(self.weekday_schedule())
+        if self.weekend_schedule():
+            period = numpy.where(features.weekend, periods(self.weekend_schedule()), period)
+        if self.dr_day_schedule():
+            dr = numpy.zeros(len(times), dtype=bool)
+            for start_at, end_at in self.dr_periods:
+                dr |= (times > start_at) & (times <= end_at)
+            period = numpy.where(dr, periods(self.dr_day_schedule()), period)
+
+        rates = dict((p, float(rate["tier1rate"])) for p, rate in self.rate_structure.iteritems())
+        missing = set(numpy.unique(period).tolist()) - set(rates)
+        if missing: raise Exception("tariff has no rate for period %s" % min(missing))
+        return numpy.array([rates[p] for p in period.tolist()], dtype=numpy.float64)
+
+    def fingerprint(self):
+        """sha1 hex digest of the tariff and dr periods as passed to tariff.R"""
+        contents = StringIO()
+        self.write_tariff_to_file(contents)
+        self.write_dr_periods_to_file(contents)
+        return hashlib.sha1(contents.getvalue()).hexdigest()
+
+    def __getstate__(self):
+        """loggers and open file handles do not pickle"""
+        state = self.__dict__.copy()
+        del state['logger']
+        state['tariff_file'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = logging.getLogger(__name__)
+
     # --- file writers --- #            
     def write_tariff_to_file(self, file_obj=None, file_name='tariff.csv'):
         if file_obj == None: file_obj = open(file_name, 'w')
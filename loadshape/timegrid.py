@@ -0,0 +1,117 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import numpy
+import utils
+import calendar_features
+
+class TimeGrid(object):
+
+    def __init__(self, start, step, count, timezone=None):
+        """regularly spaced timestamps: start, start + step, ... (count of them)
+        - stays as three numbers until the timestamps are needed; model scripts
+        receive it as --timeGrid=start,step,count instead of a timestamp file
+        - start is unix seconds, step is seconds
+        """
+        if int(step) <= 0: raise Exception("time grid step must be positive")
+        if int(count) < 1: raise Exception("time grid must have at least one timestamp")
+
+        self.start      = int(start)
+        self.step       = int(step)
+        self.count      = int(count)
+        self.timezone   = timezone if timezone != None else utils.get_timezone()
+
+    @classmethod
+    def between(cls, start_at, end_at, step_size, timezone=None):
+        """grid from start_at up to and including end_at (when it falls on a step)"""
+        start_at = utils.read_timestamp(start_at, timezone)
+        end_at = utils.read_timestamp(end_at, timezone)
+        if end_at < start_at: raise Exception("end_at must not be before start_at")
+        return cls(start_at, step_size, ((end_at - start_at) // int(step_size)) + 1, timezone)
+
+    # --- timestamps --- #
+    def times(self):
+        """the timestamps as an int64 array"""
+        return numpy.arange(self.count, dtype=numpy.int64) * self.step + self.start
+
+    def arrays(self):
+        """timestamps and (zero) values, like Series.arrays"""
+        return self.times(), numpy.zeros(self.count)
+
+    def data(self, start_at=None, end_at=None):
+        """List of (timestamp, 0) tuples, optionally between start_at and end_at"""
+        times = self.times()
+        if (start_at != None) & (end_at != None):
+            start_at = utils.read_timestamp(start_at, self.timezone)
+            end_at = utils.read_timestamp(end_at, self.timezone)
+            times = times[(times >= start_at) & (times <= end_at)]
+        return [(t, 0) for t in times.tolist()]
+
+    def start_at(self):
+        return self.start
+
+    def end_at(self):
+        return self.start + (self.step * (self.count - 1))
+
+    def calendar(self, holidays=None):
+        """calendar features of the timestamps, see calendar_features.py"""
+        return calendar_features.features(self.times(), self.timezone, holidays)
+
+    # --- model script arguments --- #
+    def options(self):
+        """arguments that pass the grid to baseline.R / diff.R / tariff.R"""
+        options = " --timeGrid=%s,%s,%s" % (self.start, self.step, self.count)
+        zone = getattr(self.timezone, 'zone', None)
+        if zone != None: options += " --timeZone=%s" % zone
+        return options
+
+    # --- value semantics --- #
+    def _key(self):
+        return (self.start, self.step, self.count, str(self.timezone))
+
+    def __eq__(self, other):
+        return isinstance(other, TimeGrid) and (self._key() == other._key())
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return "TimeGrid(%s, %s, %s)" % (self.start, self.step, self.count)
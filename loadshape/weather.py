@@ -0,0 +1,154 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import numpy
+import utils
+import threading
+
+from series import Series
+
+class WeatherRegistry(object):
+
+    # interpolation grids shared between buildings (seconds)
+    grid_steps = (300, 900, 3600)
+
+    def __init__(self):
+        """process-wide store of weather station temperature series
+        - each (station, source) is parsed once and the same Series is shared
+        by every Loadshape that refers to the station
+        - interpolations onto regular grids, and the temporary files that are
+        passed to the model scripts, are made once per grid
+        """
+        self.lock       = threading.RLock()
+        self.stations   = {}
+        self.grids      = {}
+        self.tempfiles  = {}
+
+    def register(self, station, temp_data, source='default', timezone=None,
+                 temp_units='F', replace=False):
+        """parse and store temperature data for a station
+        - temp_data may be anything a Series accepts, or a Series
+        - a station that is already registered is not parsed again unless
+        replace is True
+        """
+        key = (station, source)
+        with self.lock:
+            if (key in self.stations) and (not replace): return self.stations[key]
+
+            if isinstance(temp_data, Series):
+                series = temp_data
+            else:
+                series = Series(temp_data, timezone, temp_units)
+
+            self.clear(station, source)
+            self.stations[key] = series
+            return series
+
+    def series(self, station, source='default'):
+        with self.lock:
+            try: return self.stations[(station, source)]
+            except KeyError:
+                raise Exception("unknown weather station: %s (%s)" % (station, source))
+
+    def interpolate(self, station, source='default', step_size=900):
+        """station temperatures interpolated onto a regular grid
+        - grid points are multiples of step_size seconds since the epoch, so
+        every building that uses the same grid shares one interpolation
+        """
+        key = (station, source, step_size)
+        with self.lock:
+            if key not in self.grids:
+                self.grids[key] = interpolate(self.series(station, source), step_size)
+            return self.grids[key]
+
+    def write_to_tempfile(self, station, source='default', step_size=900, series=None):
+        """temporary file holding a station's interpolated temperatures; the
+        file is written once per grid and shared by all callers
+        - if series is given and is not the station's registered series (the
+        station was registered again with replace=True, or not in this
+        process), None is returned instead
+        """
+        key = (station, source, step_size)
+        with self.lock:
+            if (series != None) and (self.stations.get((station, source)) is not series):
+                return None
+            if key not in self.tempfiles:
+                grid = self.interpolate(station, source, step_size)
+                self.tempfiles[key] = grid.write_to_tempfile()
+            return self.tempfiles[key]
+
+    def grid_step(self, load_series):
+        """the shared grid that matches the spacing of a load series, so that
+        load timestamps fall on grid points
+        """
+        times = load_series.arrays()[0]
+        spacing = numpy.median(numpy.diff(times)) if len(times) > 1 else 0
+        for step in reversed(self.grid_steps):
+            if (spacing >= step) and (spacing % step == 0): return step
+        return self.grid_steps[0]
+
+    def clear(self, station=None, source=None):
+        """drop stations, interpolations and temporary files; if a station
+        (and source) is given, only that station is dropped
+        """
+        with self.lock:
+            for store in [self.stations, self.grids, self.tempfiles]:
+                for key in store.keys():
+                    if (station != None) and (key[0] != station): continue
+                    if (source != None) and (key[1] != source): continue
+                    del store[key]
+
+def interpolate(series, step_size=900):
+    """temperatures interpolated onto the grid of multiples of step_size
+    seconds since the epoch
+    """
+    times, values = series.arrays()
+
+    first = -(-times[0] // step_size) * step_size
+    grid = numpy.arange(first, times[-1] + 1, step_size, dtype=numpy.int64)
+    grid_values = numpy.interp(grid, times, values)
+
+    return Series.from_arrays(grid, grid_values, series.timezone, series.temp_units,
+                              trusted=True)
+
+# the process-wide registry
+registry = WeatherRegistry()
+
+def register(station, temp_data, source='default', timezone=None, temp_units='F',
+             replace=False):
+    return registry.register(station, temp_data, source, timezone, temp_units, replace)
+
+def station(station, source='default'):
+    return registry.series(station, source)
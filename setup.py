@@ -56,7 +56,9 @@ setup(name='loadshape',
       license='revised BSD',
       description='A set of tools for analyzing electric load shapes.',
       install_requires=['tzlocal>=1.0', 'pytz'],
+      extras_require={'parquet': ['pyarrow'], 'pandas': ['pandas']},
       include_package_data=True,
+      entry_points={'console_scripts': ['loadshape-batch = loadshape.batch:main']},
       test_suite='tests',
       tests_require=[],
 )
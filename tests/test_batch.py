@@ -0,0 +1,157 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import threading
+import multiprocessing
+
+from loadshape import MeterStore
+from loadshape import batch
+from loadshape.batch import JobQueue, Worker
+
+def claim_all(queue_file, worker, out):
+    queue = JobQueue(queue_file)
+    while True:
+        job = queue.claim(worker)
+        if job == None: break
+        out.put(job[0])
+        queue.complete(job[0], worker, {"worker": worker})
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue_file = os.path.join(self.directory, 'jobs.db')
+        self.queue = JobQueue(self.queue_file)
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.directory)
+
+    def test_adding_jobs_again_is_a_no_op(self):
+        assert self.queue.add_many(['a', 'b'], 'baseline', {'baseline': {'weighting_days': 14}}) == 2
+        assert self.queue.add_many(['a', 'b', 'c'], 'baseline', {'baseline': {'weighting_days': 14}}) == 1
+        assert self.queue.add('a', 'diff')
+        assert self.queue.counts()['pending'] == 4
+        self.assertRaises(Exception, self.queue.add, 'a', 'forecast')
+
+    def test_claim_complete_and_fail(self):
+        self.queue.add_many(['a', 'b'], 'baseline')
+        job_id, meter_id, kind, params = self.queue.claim('w1')
+        assert (meter_id, kind, params) == ('a', 'baseline', {})
+        assert self.queue.complete(job_id, 'w1', {'value': 1})
+
+        job_id = self.queue.claim('w1')[0]
+        assert self.queue.fail(job_id, 'w1', 'boom')
+        assert self.queue.claim('w1') == None
+
+        counts = self.queue.counts()
+        assert (counts['done'], counts['failed'], counts['pending']) == (1, 1, 0)
+        assert list(self.queue.results()) == [('a', 'baseline', {}, {'value': 1})]
+        assert list(self.queue.results(status='failed')) == [('b', 'baseline', {}, 'boom')]
+
+        assert self.queue.retry_failed() == 1
+        assert self.queue.claim('w2')[1] == 'b'
+
+    def test_expired_leases_are_claimed_again(self):
+        queue = JobQueue(self.queue_file, lease_seconds=0.1)
+        queue.add('a', 'baseline')
+        job_id = queue.claim('w1')[0]
+        assert queue.claim('w2') == None
+        assert queue.counts()['running'] == 1
+
+        time.sleep(0.2)
+        assert queue.counts()['stale'] == 1
+        assert queue.claim('w2')[0] == job_id
+        assert not queue.complete(job_id, 'w1', {})    # lease passed to w2
+        assert queue.complete(job_id, 'w2', {})
+
+    def test_running_jobs_keep_their_lease(self):
+        queue = JobQueue(self.queue_file, lease_seconds=0.3)
+        queue.add('a', 'baseline')
+        worker = Worker(queue, None, log_level=50)
+        worker.compute = lambda meter_id, kind, params: time.sleep(1) or {"value": 1}
+
+        claimed = []
+        def claim_meanwhile():
+            time.sleep(0.6)
+            claimed.append(JobQueue(self.queue_file).claim('w2'))
+        thread = threading.Thread(target=claim_meanwhile)
+        thread.start()
+
+        assert worker.run() == 1
+        thread.join()
+        assert claimed == [None]
+        assert list(queue.results()) == [('a', 'baseline', {}, {'value': 1})]
+
+    def test_claims_are_atomic_across_processes(self):
+        self.queue.add_many([str(i) for i in range(60)], 'baseline')
+        out = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=claim_all,
+                                           args=(self.queue_file, 'w%s' % i, out))
+                   for i in range(4)]
+        for w in workers: w.start()
+        for w in workers: w.join()
+
+        claimed = [out.get() for i in range(out.qsize())]
+        assert sorted(claimed) == sorted(set(claimed))
+        assert len(claimed) == 60
+        assert self.queue.counts()['done'] == 60
+
+    def test_worker_records_errors(self):
+        with MeterStore(os.path.join(self.directory, 'meters.db')) as store:
+            self.queue.add('missing', 'baseline')
+            worker = Worker(self.queue, store, 'America/Los_Angeles', log_level=50)
+            assert worker.run() == 1
+
+        meter_id, kind, params, error = list(self.queue.results(status='failed'))[0]
+        assert "no readings for meter: missing" in error
+
+    def test_cli_add(self):
+        batch.main(['add', self.queue_file, '--kind', 'diff', '--meter', 'a', '--meter', 'b',
+              '--params', '{"start_at": "2013-09-01"}'])
+        jobs = [self.queue.claim('w1') for i in range(2)]
+        assert [j[1] for j in jobs] == ['a', 'b']
+        assert jobs[0][3] == {'start_at': '2013-09-01'}
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import unittest
+
+import numpy
+
+from loadshape import Loadshape, OnlineBaseline, Series, utils
+from loadshape.bootstrap import BaselineBootstrap, percentile_band
+
+class TestBootstrap(unittest.TestCase):
+
+    def setUp(self):
+        self.timezone = utils.get_timezone('America/Los_Angeles')
+        random = numpy.random.RandomState(0)
+        self.times = numpy.arange(1377990000, 1377990000 + (21 * 86400), 900)
+        daily = numpy.sin(2 * numpy.pi * (self.times % 86400) / 86400.0)
+        self.kw = 50 + (20 * daily) + (random.randn(len(self.times)) * 3)
+        self.temps = 60 + (15 * daily)
+        self.prediction_times = self.times[-96:]
+
+    def test_replicates_match_individual_refits(self):
+        model = BaselineBootstrap(self.timezone).fit(self.times, self.kw,
+                                                     self.prediction_times,
+                                                     self.temps, self.temps[-96:])
+        deviations = model.deviations(3, seed=1)
+        errors = model._resample(numpy.random.RandomState(1), 3)
+
+        X = model.design(self.times, self.temps)
+        X_pred = model.design(self.prediction_times, self.temps[-96:])
+        days_away = (self.times - self.prediction_times.mean()) / 86400.0
+        root_weights = numpy.sqrt(1.0 / (1.0 + (days_away / 14.0) ** 2))
+
+        def refit(kw):
+            coefficients = numpy.linalg.lstsq(X * root_weights[:, numpy.newaxis],
+                                              kw * root_weights, rcond=None)[0]
+            return numpy.dot(X, coefficients), numpy.dot(X_pred, coefficients)
+
+        fitted, predicted = refit(self.kw)
+        assert numpy.allclose(predicted, model.predictions)
+        for i in range(3):
+            replicate = refit(fitted + errors[i])[1]
+            assert numpy.allclose(replicate - predicted, deviations[:, i])
+
+    def test_no_prediction_by_training_matrix(self):
+        # predicting over the whole training grid, as baseline_bands does
+        times = numpy.arange(1377990000, 1377990000 + (60 * 86400), 900)
+        kw = numpy.random.RandomState(0).randn(len(times))
+
+        shapes = []
+        dot = numpy.dot
+        def recording_dot(a, b):
+            out = dot(a, b)
+            shapes.append(numpy.shape(out))
+            return out
+
+        numpy.dot = recording_dot
+        try:
+            model = BaselineBootstrap(self.timezone).fit(times, kw, times)
+            model.deviations(20, seed=0, chunk_size=10)
+        finally:
+            numpy.dot = dot
+
+        assert len(shapes) > 0
+        assert (len(times), len(times)) not in shapes
+
+    def test_whole_days_are_resampled(self):
+        model = BaselineBootstrap(self.timezone, block_days=2)
+        model.fit(self.times, self.kw, self.prediction_times)
+        errors = model._resample(numpy.random.RandomState(2), 1)[0]
+
+        table = model.residual_table
+        for day in range(0, model.n_days - 1, 2):
+            today = errors[model.day_index == day]
+            match = [d for d in range(model.n_days - 1)
+                     if numpy.allclose(today, table[d][model.slot_index[model.day_index == day]])]
+            assert len(match) > 0
+            tomorrow = errors[model.day_index == day + 1]
+            assert numpy.allclose(tomorrow, table[match[0] + 1][model.slot_index[model.day_index == day + 1]])
+
+    def test_repeated_dst_hour_keeps_its_residuals(self):
+        # 2013-11-03 is a 25 hour day in Los Angeles
+        times = numpy.arange(1383375600, 1383375600 + (3 * 86400), 900)
+        kw = numpy.random.RandomState(0).randn(len(times))
+        model = BaselineBootstrap(self.timezone).fit(times, kw, times[-96:])
+
+        cells = set(zip(model.day_index.tolist(), model.slot_index.tolist()))
+        assert len(cells) == len(times)
+        assert (model.day_index == 1).sum() == 100
+        assert model.slot_index[model.day_index == 1].max() == 99
+
+    def test_temperature_variables(self):
+        model = BaselineBootstrap(self.timezone)
+        online = OnlineBaseline(self.timezone)
+        temps = [20, 45, 60, 70, 85, 100]
+        expected = [online.temperature_variables(t) for t in temps]
+        assert numpy.allclose(model.temperature_variables(temps), expected)
+
+    def test_percentile_band(self):
+        lower, upper = percentile_band(numpy.arange(101), confidence=0.9)
+        assert (lower, upper) == (5, 95)
+
+    def test_baseline_bands(self):
+        l = Loadshape(Series.from_arrays(self.times, self.kw, self.timezone),
+                      timezone='America/Los_Angeles', log_level=40)
+        l._set_baseline(Series.from_arrays(self.times, self.kw, self.timezone), {},
+                        {'weighting_days': 14, 'modeling_interval': 900})
+
+        bands = l.baseline_bands(self.prediction_times[0], self.prediction_times[-1],
+                                 replicates=50, seed=0)
+        baseline, lower, upper = bands
+        assert len(baseline.values()) == 96
+        assert (bands.column('lower') <= bands.column('baseline')).all()
+        assert (bands.column('upper') >= bands.column('baseline')).all()
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
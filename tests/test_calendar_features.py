@@ -0,0 +1,99 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import unittest
+import datetime
+
+from loadshape import Series, utils
+from loadshape import calendar_features
+from loadshape.calendar_features import CalendarFeatures
+
+class TestCalendarFeatures(unittest.TestCase):
+
+    def setUp(self):
+        self.timezone = utils.get_timezone('America/Los_Angeles')
+        # a week of 15 minute intervals spanning the end of daylight saving time
+        start = utils.read_timestamp("2013-10-30 00:00:00", self.timezone)
+        self.times = range(start, start + (7 * 86400), 900)
+
+    def test_fields_match_datetime(self):
+        f = CalendarFeatures(self.times, self.timezone)
+        for i, t in enumerate(self.times):
+            local = utils.int_to_datetime(t, self.timezone)
+            assert f.hour[i] == local.hour
+            assert f.minute[i] == local.minute
+            assert f.month[i] == local.month
+            assert f.weekday[i] == (local.weekday() + 1) % 7
+            assert f.weekend[i] == (local.weekday() >= 5)
+
+    def test_half_hour_offsets(self):
+        timezone = utils.get_timezone('America/St_Johns')
+        # daylight saving time starts at 02:00 NST (05:30 UTC) on 2013-03-10
+        start = 1362893400 - 3600
+        times = range(start, start + 7200, 900)
+        f = CalendarFeatures(times, timezone)
+        for i, t in enumerate(times):
+            local = utils.int_to_datetime(t, timezone)
+            assert (f.hour[i], f.minute[i]) == (local.hour, local.minute)
+        assert (f.hour[4], f.minute[4]) == (3, 0)
+
+        fixed = calendar_features.utc_offsets(times, utils.get_timezone('UTC'))
+        assert fixed.tolist() == [0] * len(times)
+
+    def test_interval_of_week(self):
+        f = CalendarFeatures(self.times, self.timezone)
+        sunday_noon = utils.read_timestamp("2013-11-03 12:00:00", self.timezone)
+        i = self.times.index(sunday_noon)
+        assert f.interval_of_week(15)[i] == 48
+        assert f.interval_of_week(60)[i] == 12
+
+    def test_holidays(self):
+        f = CalendarFeatures(self.times, self.timezone, holidays=["2013-11-01"])
+        friday = utils.read_timestamp("2013-11-01 09:00:00", self.timezone)
+        assert f.holiday[self.times.index(friday)]
+        assert f.holiday.sum() == 96
+        assert not f.workday()[self.times.index(friday)]
+
+    def test_features_are_shared(self):
+        calendar_features.clear()
+        a = Series([(t, 1.0) for t in self.times], self.timezone)
+        b = Series([(t, 2.0) for t in self.times], self.timezone)
+        assert a.calendar() is b.calendar()
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import numpy
+import shutil
+import tempfile
+import unittest
+
+from os import path
+from loadshape import Loadshape, Series, SeriesFrame, utils
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+@unittest.skipIf(pyarrow == None, "pyarrow is not installed")
+class TestColumnar(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.tz = utils.get_timezone('America/Los_Angeles')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_kw_data_filepath(self):
+        test_dir = path.dirname(path.abspath(__file__))
+        return path.join(test_dir, 'data', 'test_kw.csv')
+
+    def test_parquet_round_trip(self):
+        series = Series(self.get_kw_data_filepath(), self.tz)
+        filename = path.join(self.tmp_dir, 'kw.parquet')
+        series.to_parquet(filename)
+
+        copy = Series.from_parquet(filename, timezone=self.tz)
+        assert copy.data() == series.data()
+
+    def test_parquet_time_range_skips_row_groups(self):
+        series = Series(self.get_kw_data_filepath(), self.tz)
+        filename = path.join(self.tmp_dir, 'kw.parquet')
+        series.to_parquet(filename, row_group_size=100)
+
+        start_at, end_at = series.series[250][0], series.series[349][0]
+        copy = Series.from_parquet(filename, timezone=self.tz,
+                                   start_at=start_at, end_at=end_at)
+        assert copy.data() == series.data(start_at, end_at)
+
+        from loadshape import columnar
+        parquet_file = pyarrow.parquet.ParquetFile(filename)
+        row_groups = columnar._row_groups_in_range(parquet_file, 'timestamp', start_at, end_at)
+        assert row_groups == [2, 3]
+
+    def test_arrow_integer_and_naive_timestamps(self):
+        local = ["2013-10-12 00:00:00", "2013-10-12 00:15:00"]
+        unix = [utils.read_timestamp(t, self.tz) for t in local]
+        naive = [utils.str_to_datetime(t, self.tz).replace(tzinfo=None) for t in local]
+
+        table = pyarrow.Table.from_arrays(
+            [pyarrow.array(unix), pyarrow.array(naive, type=pyarrow.timestamp('s')),
+             pyarrow.array([1.0, None])], names=['unix', 'local', 'kw'])
+
+        by_unix = Series.from_arrow(table, 'unix', 'kw', timezone=self.tz)
+        by_local = Series.from_arrow(table, 'local', 'kw', timezone=self.tz)
+        assert by_unix.data() == [(unix[0], 1.0)]
+        assert by_local.data() == [(unix[0], 1.0)]
+
+    def test_write_multiple_series(self):
+        l_data = [(1379487600, 5.0), (1379488500, 5.0), (1379489400, 5.0)]
+        b_data = [(1379488500, 4.0), (1379489400, 4.0), (1379490300, 4.0)]
+        ls = Loadshape(l_data, timezone='America/Los_Angeles', log_level=40)
+        ls.baseline_series = Series(b_data, self.tz)
+
+        filename = path.join(self.tmp_dir, 'results.parquet')
+        ls.write_parquet(filename)
+
+        table = pyarrow.parquet.read_table(filename)
+        assert table.column_names == ['timestamp', 'kw', 'kw_base']
+        assert table.num_rows == 4
+        assert Series.from_parquet(filename, value_column='kw_base', timezone=self.tz).data() == b_data
+
+@unittest.skipIf(pandas == None, "pandas is not installed")
+class TestPandas(unittest.TestCase):
+
+    def setUp(self):
+        self.tz = utils.get_timezone('America/Los_Angeles')
+        self.index = pandas.date_range('2013-11-02', periods=200, freq='15min',
+                                       tz='America/Los_Angeles')
+
+    def test_series_round_trip(self):
+        data = pandas.Series(numpy.arange(200.0), index=self.index)
+        series = Series.from_pandas(data, timezone=self.tz)
+        assert series.start_at() == 1383375600
+        assert numpy.may_share_memory(series.arrays()[1], data.values)
+
+        copy = series.to_pandas()
+        assert copy.index.equals(self.index)
+        assert numpy.may_share_memory(copy.values, series.arrays()[1])
+
+    def test_shared_values_are_read_only(self):
+        series = Series.from_pandas(pandas.Series(numpy.arange(200.0), index=self.index),
+                                    timezone=self.tz)
+        fingerprint = series.fingerprint()
+        def write(): series.to_pandas().iloc[0] = 100
+        self.assertRaises(ValueError, write)
+        assert series.values()[0] == 0 and series.fingerprint() == fingerprint
+
+        frame = SeriesFrame([1375340400], [('kw', [1.0])], self.tz)
+        def write_frame(): frame.to_pandas().iloc[0, 0] = 100
+        self.assertRaises(ValueError, write_frame)
+        assert frame.column('kw')[0] == 1.0
+
+    def test_local_times_and_columns(self):
+        naive = pandas.Series([1.0, 2.0], index=pandas.to_datetime(['2013-08-01 00:00',
+                                                                    '2013-08-01 00:15']))
+        assert Series.from_pandas(naive, timezone=self.tz).data() == [(1375340400, 1.0),
+                                                                       (1375341300, 2.0)]
+
+        frame = pandas.DataFrame({'ts': [1375341300, 1375340400], 'kw': [2.0, 1.0]})
+        series = Series.from_pandas(frame, timestamp_column='ts', timezone=self.tz)
+        assert series.data() == [(1375340400, 1.0), (1375341300, 2.0)]
+
+    def test_frame_round_trip(self):
+        frame = SeriesFrame([1375340400, 1375341300], [('kw_diff', [1.0, 2.0]),
+                                                       ('kw_base', [3.0, 4.0])], self.tz)
+        data = frame.to_pandas()
+        assert list(data.columns) == ['kw_diff', 'kw_base']
+        assert numpy.may_share_memory(data.values, frame.values)
+
+        copy = SeriesFrame.from_pandas(data, self.tz)
+        assert copy.times.tolist() == [1375340400, 1375341300]
+        assert copy['kw_base'].values() == [3.0, 4.0]
+
+    def test_loadshape_accepts_pandas(self):
+        data = pandas.Series(numpy.arange(200.0), index=self.index)
+        ls = Loadshape(data, timezone='America/Los_Angeles', log_level=40)
+        assert len(ls.training_load_series.values()) == 200
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
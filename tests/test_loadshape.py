@@ -36,8 +36,11 @@
 import unittest
 
 from os import path
+from distutils.spawn import find_executable
 from loadshape import Loadshape, Series, Tariff
 
+rscript = find_executable('Rscript')
+
 class TestLoadshape(unittest.TestCase):
 
     def get_kw_data_filepath(self):
@@ -116,6 +119,118 @@ class TestLoadshape(unittest.TestCase):
         assert s.start_at() == start_at
         assert s.end_at() == end_at
 
+    def test_rolling_day_boundaries_follow_dst(self):
+        l = Loadshape([], log_level=40, timezone='America/Los_Angeles')
+        days = l._day_boundaries("2013-11-02 12:00:00", "2013-11-03 12:00:00", horizon=1)
+        assert len(days) == 3
+        assert days[1] - days[0] == 86400
+        assert days[2] - days[1] == 90000
+
+    @unittest.skipIf(rscript == None, "R is not installed")
+    def test_rolling_origin_matches_truncated_baseline(self):
+        import numpy
+        l = Loadshape(self.get_kw_data_filepath(), self.get_temp_data_filepath(),
+                      timezone='America/Los_Angeles', log_level=40)
+        frame = l.rolling_baselines("2013-08-10", "2013-08-10")
+        origin = l._day_boundaries("2013-08-10", "2013-08-10")[0]
+
+        times, kw = l.training_load_series.arrays()
+        keep = times <= origin
+        truncated = Loadshape(Series.from_arrays(times[keep], kw[keep], 'America/Los_Angeles'),
+                              self.get_temp_data_filepath(),
+                              timezone='America/Los_Angeles', log_level=40)
+        baseline_times, baseline = truncated.baseline(origin + 900, origin + 86400).arrays()
+
+        window = (frame.times > origin) & (frame.times <= origin + 86400)
+        assert frame.times[window].tolist() == baseline_times.tolist()
+        assert numpy.allclose(frame.column('baseline_1')[window], baseline, atol=0.011)
+
+    def test_occupancy_cache_file_is_keyed_by_inputs(self):
+        import shutil, tempfile
+        cache_dir = tempfile.mkdtemp()
+        try:
+            l = Loadshape(self.get_kw_data_filepath(), self.get_temp_data_filepath(),
+                          timezone='America/Los_Angeles', log_level=40,
+                          cache_dir=cache_dir)
+            power_tmp = l.training_load_series.write_to_tempfile()
+            temp_tmp = l.training_temperature_series.write_to_tempfile()
+
+            a = l._occupancy_cache_file(900, 'TRUE', power_tmp, temp_tmp)
+            b = l._occupancy_cache_file(900, 'TRUE', power_tmp, temp_tmp)
+            c = l._occupancy_cache_file(3600, 'TRUE', power_tmp, temp_tmp)
+
+            l.add_exclusion(l.training_load_series.start_at(),
+                            l.training_load_series.start_at() + 86400)
+            power_tmp = l.training_load_series.write_to_tempfile()
+            d = l._occupancy_cache_file(900, 'TRUE', power_tmp, temp_tmp)
+
+            assert a == b
+            assert a != c
+            assert a != d
+            assert path.dirname(a) == path.join(cache_dir, 'occupancy')
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_script_output_is_captured_per_call(self):
+        import threading
+        from loadshape.scheduler import Scheduler
+        l = Loadshape([], log_level=40, timezone='America/Los_Angeles',
+                      scheduler=Scheduler(max_processes=4))
+        outputs = {}
+        def run(n): outputs[n] = l._run_script("echo %s" % n).stdout.strip()
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        assert outputs == dict((n, str(n)) for n in range(8))
+
+    def test_pickle_without_lock(self):
+        import pickle
+        l = Loadshape(self.get_kw_data_filepath(), timezone='America/Los_Angeles',
+                      log_level=40)
+        copy = pickle.loads(pickle.dumps(l))
+        assert copy.training_load_series.data() == l.training_load_series.data()
+        with copy._lock: assert copy.baseline_series == None
+
+    def test_scenario_frame(self):
+        from collections import OrderedDict
+        l = Loadshape([], log_level=40, timezone='America/Los_Angeles')
+        times = [1379487600, 1379488500, 1379489400]
+        cool = [(1379487000, 60), (1379490000, 70)]
+        warm = Series([(1379487000, 80), (1379490000, 90)], 'America/Los_Angeles')
+
+        frame = l._scenario_frame([cool, warm], times)
+        assert frame.keys() == ['scenario_1', 'scenario_2']
+        assert frame.times.tolist() == times
+        assert frame.column('scenario_1').tolist() == [62, 65, 68]
+        assert frame.column('scenario_2').tolist() == [82, 85, 88]
+
+        assert l._scenario_frame({'warm': warm, 'cool': cool}, times).keys() == ['cool', 'warm']
+        ordered = OrderedDict([('warm', warm), ('cool', cool)])
+        assert l._scenario_frame(ordered, times).keys() == ['warm', 'cool']
+
+        short = [(1379487000, 60), (1379488000, 70)]
+        self.assertRaises(Exception, l._scenario_frame, [cool, short], times)
+        self.assertRaises(Exception, l._scenario_frame, [], times)
+
+    @unittest.skipIf(rscript == None, "R is not installed")
+    def test_scenario_matches_forecast_baseline(self):
+        start_at, end_at = "2013-08-14 00:00:00", "2013-08-15 12:00:00"
+        l = Loadshape(self.get_kw_data_filepath(), self.get_temp_data_filepath(),
+                      forecast_temp_data=self.get_temp_data_filepath(),
+                      timezone='America/Los_Angeles', log_level=40)
+        baseline = l.baseline(start_at, end_at)
+        frame = l.scenario_baselines([self.get_temp_data_filepath()], start_at, end_at)
+
+        times, values = baseline.arrays()
+        assert frame.times.tolist() == times.tolist()
+        for expected, value in zip(values, frame.column('scenario_1')):
+            self.assertAlmostEqual(expected, value, delta=0.011)
+
+    def test_scenario_baselines_require_temperatures(self):
+        l = Loadshape(self.get_kw_data_filepath(), timezone='America/Los_Angeles',
+                      log_level=40)
+        self.assertRaises(Exception, l.scenario_baselines, [[(1379487000, 60)]])
+
 def main():
     unittest.main()
 
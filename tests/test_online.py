@@ -0,0 +1,100 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import unittest
+
+from loadshape import OnlineBaseline, utils
+
+class TestOnlineBaseline(unittest.TestCase):
+    # 2013-09-01 00:00:00 America/Los_Angeles (a Sunday)
+    start_at = 1378018800
+
+    def weekly_load(self, timestamp, tz):
+        local = utils.int_to_datetime(timestamp, tz)
+        occupied = (local.weekday() < 5) & (8 <= local.hour < 18)
+        return 10.0 if occupied else 4.0
+
+    def test_interval_of_week_starts_on_sunday(self):
+        model = OnlineBaseline(timezone='America/Los_Angeles', interval_minutes=15)
+        assert model.interval_of_week(self.start_at) == 0
+        assert model.interval_of_week(self.start_at + 86400 + 900) == 97
+
+    def test_temperature_variables(self):
+        model = OnlineBaseline(timezone='America/Los_Angeles', temp_units='C')
+        knots = model.temp_knots
+        below = model.temperature_variables(knots[0] - 1)
+        above = model.temperature_variables(knots[-1] + 1)
+        assert below[0] == knots[0] - 1
+        assert sum(below[1:]) == 0
+        assert abs(sum(above) - (knots[-1] + 1)) < 1e-9
+
+    def test_learns_time_of_week_profile(self):
+        model = OnlineBaseline(timezone='America/Los_Angeles', use_temperature=False)
+        tz = model.timezone
+        times = range(self.start_at, self.start_at + (21 * 86400), 900)
+        for t in times: model.update(t, self.weekly_load(t, tz))
+
+        future = range(times[-1] + 900, times[-1] + 86400, 900)
+        prediction = model.predict(future)
+
+        assert len(prediction.data()) == len(future)
+        for t, value in prediction.data():
+            assert abs(value - self.weekly_load(t, tz)) < 0.01
+
+    def test_learns_temperature_response(self):
+        model = OnlineBaseline(timezone='America/Los_Angeles', temp_units='F')
+        tz = model.timezone
+        times = range(self.start_at, self.start_at + (28 * 86400), 900)
+        for i, t in enumerate(times):
+            temp = 55 + ((i * 37) % 31)
+            model.update(t, self.weekly_load(t, tz) + 0.2 * temp, temp)
+
+        t = times[-1] + 900
+        prediction = model.predict([t, t], [65, 75])
+        v65, v75 = prediction.values()
+
+        assert abs((v75 - v65) - 2.0) < 0.1
+
+    def test_unusable_observations_are_skipped(self):
+        model = OnlineBaseline(timezone='America/Los_Angeles')
+        assert model.update(self.start_at, 5.0, None) == False
+        assert model.update(self.start_at, 'NaN', 60) == False
+        assert model.n_updates == 0
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from loadshape import ResultCache, Series, utils
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_put_and_get(self):
+        cache = ResultCache(self.directory)
+        key = ResultCache.key('baseline.R', 14, 900)
+        assert cache.get(key) == None
+
+        cache.put(key, times=numpy.arange(3), values=numpy.array([1.5, 2.5, 3.5]))
+        entry = cache.get(key)
+        assert entry['times'].tolist() == [0, 1, 2]
+        assert entry['values'].tolist() == [1.5, 2.5, 3.5]
+
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['stores']) == (1, 1, 1)
+
+    def test_keys(self):
+        assert ResultCache.key('a', 1) == ResultCache.key('a', 1)
+        assert ResultCache.key('a', 1) != ResultCache.key('a', 2)
+
+    def test_least_recently_used_are_evicted(self):
+        values = numpy.zeros(1000)
+        cache = ResultCache(self.directory, max_bytes=20000)
+        for key in ['a', 'b']:
+            cache.put(key, values=values)
+        os.utime(cache._filename('a'), (time.time() - 60, time.time() - 60))
+        os.utime(cache._filename('b'), (time.time() - 30, time.time() - 30))
+
+        assert cache.get('a') != None   # now the most recently used
+        cache.put('c', values=values)
+
+        assert cache.get('b') == None
+        assert cache.get('a') != None
+        assert cache.get('c') != None
+        assert cache.stats()['evictions'] == 1
+
+    def test_series_fingerprint(self):
+        timezone = utils.get_timezone('America/Los_Angeles')
+        data = [(1379487600, 1.0), (1379488500, 2.0)]
+        a = Series(data, timezone)
+        b = Series(data, timezone)
+        assert a.fingerprint() == b.fingerprint()
+
+        a.add_exclusion(1379487600, 1379488000)
+        assert a.fingerprint() != b.fingerprint()
+        assert a.fingerprint(exclude=False) == b.fingerprint(exclude=False)
+
+        b.append([(1379489400, 3.0)])
+        assert a.fingerprint(exclude=False) != b.fingerprint(exclude=False)
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import time
+import unittest
+import threading
+
+from loadshape.scheduler import Scheduler
+
+class TestScheduler(unittest.TestCase):
+
+    def run_in_threads(self, scheduler, command, count):
+        jobs = []
+        def run(): jobs.append(scheduler.run(command))
+        threads = [threading.Thread(target=run) for i in range(count)]
+        for t in threads: t.start()
+        return threads, jobs
+
+    def test_run(self):
+        job = Scheduler().run("echo hello")
+        assert job.succeeded()
+        assert job.stdout.strip() == "hello"
+
+    def test_timeout_kills_job(self):
+        started_at = time.time()
+        job = Scheduler(timeout=0.2).run("sleep 5")
+        assert job.killed
+        assert not job.succeeded()
+        assert time.time() - started_at < 4
+
+    def test_late_timeout_leaves_finished_job(self):
+        scheduler = Scheduler()
+        job = scheduler.run("echo hello")
+        scheduler._kill(None, job)
+        assert job.succeeded()
+
+    def test_memory_limit(self):
+        command = "python -c 'x = bytearray(512 * 1024 * 1024)'"
+        assert not Scheduler(memory_limit=256 * 1024 * 1024).run(command).succeeded()
+
+    def test_concurrency_limit(self):
+        scheduler = Scheduler(max_processes=1)
+        started_at = time.time()
+        threads, jobs = self.run_in_threads(scheduler, "sleep 0.2", 3)
+        for t in threads: t.join()
+        assert len(jobs) == 3
+        assert time.time() - started_at >= 0.6
+        assert scheduler.stats()['completed'] == 3
+
+    def test_full_queue_is_refused(self):
+        scheduler = Scheduler(max_processes=1, max_queue=1)
+        threads, jobs = self.run_in_threads(scheduler, "sleep 0.5", 2)
+        time.sleep(0.2)
+        assert scheduler.stats()['queued'] == 1
+        self.assertRaises(Exception, scheduler.run, "true")
+        for t in threads: t.join()
+        assert scheduler.stats()['refused'] == 1
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
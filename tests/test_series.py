@@ -33,11 +33,18 @@
 # owned rights.
 # --------------------------------------------------
 
+import pickle
 import unittest
+import multiprocessing
+
+import numpy
 
 from os import path
 from loadshape import Series
 
+def shared_series_sum(series):
+    return (series.sum(), series._shared_file)
+
 class TestSeries(unittest.TestCase):
     
     def dummy_data(self):
@@ -90,6 +97,149 @@ class TestSeries(unittest.TestCase):
 
         assert out == expected
 
+    def test_pickle_round_trip(self):
+        series = Series(self.get_kw_data_filepath())
+        series.add_exclusion(1379488500, 1379490300)
+        copy = pickle.loads(pickle.dumps(series, pickle.HIGHEST_PROTOCOL))
+        assert copy.data() == series.data()
+        assert copy.exclusions == series.exclusions
+
+    def test_pickle_is_compact(self):
+        series = Series(self.get_kw_data_filepath())
+        size = len(pickle.dumps(series, pickle.HIGHEST_PROTOCOL))
+        assert size < (len(series.series) * 16) + 1024
+
+    def test_shared_memory(self):
+        series = Series(self.get_kw_data_filepath())
+        shared_file = series.share_memory()
+        try:
+            assert path.exists(shared_file)
+            assert len(pickle.dumps(series, pickle.HIGHEST_PROTOCOL)) < 1024
+
+            pool = multiprocessing.Pool(2)
+            results = pool.map(shared_series_sum, [series, series])
+            pool.close()
+            pool.join()
+
+            for total, attached_file in results:
+                assert total == series.sum()
+                assert attached_file == shared_file
+        finally:
+            series.release_memory()
+
+        assert not path.exists(shared_file)
+        assert series.sum() == results[0][0]
+
+    def test_tempfile_is_reused_until_exclusions_change(self):
+        series = Series(self.dummy_data())
+        a = series.write_to_tempfile()
+        assert series.write_to_tempfile() is a
+
+        unexcluded = series.write_to_tempfile(exclude=False)
+        series.add_exclusion(1379488500, 1379490300)
+        b = series.write_to_tempfile()
+        assert b is not a
+        assert len(open(b.name).readlines()) == 2
+        assert series.write_to_tempfile(exclude=False) is unexcluded
+
+        series.clear_exclusions()
+        assert series.write_to_tempfile() is not b
+
+    def test_tempfile_keeps_latest_window(self):
+        series = Series(self.dummy_data())
+        for start_at in range(1379487600, 1379491200, 900):
+            window = series.write_to_tempfile(start_at=start_at)
+            assert series.write_to_tempfile(start_at=start_at) is window
+        assert len(series._tempfiles) == 1
+        assert series.write_to_tempfile() is not window
+
+    def test_csv_timestamps_match_row_parsing(self):
+        series = Series(self.get_kw_data_filepath(), 'America/Los_Angeles')
+        with open(self.get_kw_data_filepath()) as f:
+            rows = [row.strip().split(',') for row in f if row.strip()]
+        slow = Series([], 'America/Los_Angeles').load_list(rows)
+        assert series.data(exclude=False) == sorted(slow)
+
+    def test_unsorted_input_is_sorted(self):
+        series = Series(list(reversed(self.dummy_data())))
+        assert series.data() == self.dummy_data()
+
+    def test_trusted_arrays(self):
+        times, values = zip(*self.dummy_data())
+        series = Series.from_arrays(times, values, trusted=True)
+        assert series.data() == self.dummy_data()
+
+    def test_invalid_timestamps(self):
+        self.assertRaises(Exception, Series.from_arrays, [99999999999999999], [1.0])
+
+    def test_fractional_timestamps(self):
+        self.assertRaises(Exception, Series.from_arrays, [1379487600.5], [1.0])
+        self.assertRaises(Exception, Series.from_arrays, [1379487600], ["one"])
+        series = Series.from_arrays([1379487600.0], [1])
+        assert series.data() == [(1379487600, 1.0)]
+
+    def test_append_newer_readings(self):
+        series = Series(self.dummy_data()[:2])
+        for entry in self.dummy_data()[2:]:
+            series.append([entry])
+        assert series.data() == self.dummy_data()
+
+    def test_append_out_of_order_readings(self):
+        series = Series(self.dummy_data()[::2])
+        series.append(self.dummy_data()[1::2])
+        assert series.data() == self.dummy_data()
+
+    def test_append_duplicate_policies(self):
+        update = [(1379488500, 6.0), (1379492100, 7.0)]
+        for duplicates, value in [('first', 2.0), ('last', 6.0), ('mean', 4.0)]:
+            series = Series(self.dummy_data())
+            series.extend(Series(update), duplicates=duplicates)
+            assert len(series.data()) == 6
+            assert dict(series.data())[1379488500] == value
+
+    def test_append_invalidates_tempfile(self):
+        series = Series(self.dummy_data()[:4])
+        tmp_file = series.write_to_tempfile()
+        series.append(self.dummy_data()[4:])
+        assert series.write_to_tempfile() is not tmp_file
+
+    def test_energy_between(self):
+        # 15 minute readings: 4 kW, 8 kW, 12 kW
+        series = Series([(1379487600, 4.0), (1379488500, 8.0), (1379489400, 12.0)],
+                        'America/Los_Angeles')
+        assert series.energy_between(1379486700, 1379489400) == 6.0
+        assert series.energy_between(1379487600, 1379489400) == 5.0
+        assert series.energy_between(1379487600, 1379488050) == 1.0     # half of 8 kW for 15 min
+        assert series.energy_between(1379400000, 1379600000) == 6.0     # outside counts for nothing
+        assert series.mean_power_between(1379487600, 1379489400) == 10.0
+        assert series.mean_power_between(1379400000, 1379600000) == 8.0
+
+    def test_energy_between_gap(self):
+        # constant 4 kW every 15 minutes, with a 2.5 hour gap before the last reading
+        times = [1379487600 + 900 * i for i in range(4)] + [1379490300 + 9000]
+        series = Series([(t, 4.0) for t in times], 'America/Los_Angeles')
+        assert series.energy_between(times[-1] - 900, times[-1]) == 1.0
+        assert series.energy_between(times[-2], times[-1] - 900) == 0.0
+        assert series.energy_between(times[0] - 900, times[-1]) == 5.0
+        assert series.mean_power_between(times[-1] - 900, times[-1]) == 4.0
+        assert series.mean_power_between(times[0] - 900, times[-1]) == 4.0
+        assert numpy.isnan(series.mean_power_between(times[-2], times[-1] - 900))
+
+    def test_energy_index_is_rebuilt_after_changes(self):
+        series = Series([(1379487600, 4.0), (1379488500, 8.0)], 'America/Los_Angeles')
+        assert series.energy_between(1379487600, 1379489400) == 2.0
+        series.append([(1379489400, 12.0)])
+        assert series.energy_between(1379487600, 1379489400) == 5.0
+        copy = pickle.loads(pickle.dumps(series))
+        assert copy.energy_between(1379487600, 1379489400) == 5.0
+
+    def test_energy_between_missing_values(self):
+        series = Series.from_arrays([1379487600, 1379488500, 1379489400],
+                                    [4.0, float('nan'), 12.0], 'America/Los_Angeles',
+                                    trusted=True)
+        assert series.energy_between(1379487600, 1379489400) == 5.0
+        assert Series([], 'America/Los_Angeles').energy_between(0, 1) == 0.0
+
 def main():
     unittest.main()
 
@@ -0,0 +1,91 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import unittest
+import tempfile
+
+import numpy
+
+from loadshape import SeriesFrame, utils
+
+class TestSeriesFrame(unittest.TestCase):
+
+    def setUp(self):
+        self.timezone = utils.get_timezone('America/Los_Angeles')
+        self.tmp = tempfile.NamedTemporaryFile()
+        self.tmp.write("2013-09-18 00:00:00,1.5,10,NA\n")
+        self.tmp.write("2013-09-18 00:15:00,2.5,20,3\n")
+        self.tmp.write("2013-09-18 00:30:00,3.5,30,4\n")
+        self.tmp.flush()
+        self.frame = SeriesFrame.from_csv(self.tmp.name, ['a', 'b', 'c'], self.timezone)
+
+    def test_from_csv(self):
+        assert self.frame.times.tolist() == [1379487600, 1379488500, 1379489400]
+        assert self.frame.keys() == ['a', 'b', 'c']
+        assert self.frame.column('b').tolist() == [10, 20, 30]
+
+    def test_unpacking(self):
+        a, b, c = self.frame
+        assert a.values() == [1.5, 2.5, 3.5]
+        assert b.values() == [10, 20, 30]
+
+    def test_indexing(self):
+        assert self.frame[0] is self.frame['a']
+        assert self.frame[-1] is self.frame['c']
+        self.assertRaises(KeyError, lambda: self.frame['d'])
+        self.assertRaises(IndexError, lambda: self.frame[3])
+
+    def test_zero_copy(self):
+        times, values = self.frame['b'].arrays()
+        assert numpy.may_share_memory(values, self.frame.values)
+        assert numpy.may_share_memory(times, self.frame.times)
+
+    def test_missing_values(self):
+        assert self.frame['c'].data() == [(1379488500, 3), (1379489400, 4)]
+        assert numpy.isnan(self.frame.column('c')[0])
+
+    def test_write_to_file(self):
+        out = self.frame.write_to_file(tempfile.NamedTemporaryFile())
+        with open(out.name) as f:
+            assert f.readline() == "2013-09-18 00:00:00,1.5,10.0,NA\n"
+        frame = SeriesFrame.from_csv(out.name, ['a', 'b', 'c'], self.timezone)
+        assert frame.times.tolist() == self.frame.times.tolist()
+        numpy.testing.assert_array_equal(frame.values, self.frame.values)
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
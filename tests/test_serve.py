@@ -0,0 +1,133 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import json
+import httplib
+import unittest
+import threading
+
+from loadshape import Series, utils
+from loadshape.serve import BaselineService, BuildingCache, Building, make_server
+
+class TestServe(unittest.TestCase):
+
+    def l_data(self):
+        return [(1379487600, 5.0), (1379488500, 5.0), (1379489400, 5.0), (1379490300, 5.0), (1379491200, 5.0)]
+
+    def b_data(self):
+        return [(1379487600, 4.0), (1379488500, 4.0), (1379489400, 4.0), (1379490300, 4.0), (1379491200, 4.0)]
+
+    def service_with_building(self, building_id='b1'):
+        service = BaselineService(log_level=40)
+        service.load_building(building_id, {"load_data": self.l_data(),
+                                            "timezone": "America/Los_Angeles"}, fit=False)
+        building = service.buildings.get(building_id)
+        building.loadshape.baseline_series = Series(self.b_data(),
+                                                    utils.get_timezone('America/Los_Angeles'))
+        return service, building
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = BuildingCache(max_buildings=2)
+        cache.put('a', Building(None))
+        cache.put('b', Building(None))
+        cache.get('a')
+        cache.put('c', Building(None))
+        assert sorted(cache.building_ids()) == ['a', 'c']
+
+    def test_cache_evicts_idle_buildings(self):
+        cache = BuildingCache(idle_seconds=10)
+        cache.put('a', Building(None))
+        cache.put('b', Building(None))
+        cache.entries['a'].last_access -= 60
+        assert cache.evict_idle() == ['a']
+        assert cache.building_ids() == ['b']
+
+    def test_cache_snapshot(self):
+        cache = BuildingCache()
+        a, b = Building(None), Building(None)
+        cache.put('a', a)
+        cache.put('b', b)
+        snapshot = cache.snapshot()
+        cache.remove('a')
+        assert snapshot == [('a', a), ('b', b)]
+
+    def test_unknown_building(self):
+        service = BaselineService(log_level=40)
+        status, payload = service.handle('GET', '/buildings/nope/baseline')
+        assert status == 404
+
+    def test_bad_parameters(self):
+        service, building = self.service_with_building()
+        status, payload = service.handle('GET', '/buildings/b1/baseline', {"step_size": "15m"})
+        assert status == 400
+        assert payload["error"] == "step_size must be an integer"
+
+        status, payload = service.handle('PUT', '/buildings/b2', body={"load_dta": []})
+        assert status == 400
+        assert payload["error"] == "unknown building argument: load_dta"
+
+    def test_baseline_query_is_memoized(self):
+        service, building = self.service_with_building()
+        params = {"start_at": "1379488500", "end_at": "1379490300"}
+
+        status, payload = service.handle('GET', '/buildings/b1/baseline', params)
+        assert status == 200
+        assert payload["baseline"] == self.b_data()[1:4]
+        assert len(building.results) == 1
+
+        service.handle('GET', '/buildings/b1/baseline', params)
+        assert len(building.results) == 1
+
+    def test_http_transport(self):
+        service, building = self.service_with_building()
+        server = make_server(service, port=0)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            conn = httplib.HTTPConnection('127.0.0.1', server.server_address[1])
+            conn.request('GET', '/status')
+            response = conn.getresponse()
+            assert response.status == 200
+            assert 'b1' in json.loads(response.read())["buildings"]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
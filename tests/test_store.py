@@ -0,0 +1,90 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import shutil
+import tempfile
+import unittest
+
+from os import path
+from loadshape import MeterStore, Series
+
+class TestMeterStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = MeterStore(path.join(self.tmp_dir, 'meters.db'),
+                                timezone='America/Los_Angeles')
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def get_kw_data_filepath(self):
+        test_dir = path.dirname(path.abspath(__file__))
+        return path.join(test_dir, 'data', 'test_kw_small.csv')
+
+    def test_ingest_and_read_range(self):
+        series = Series(self.get_kw_data_filepath(), 'America/Los_Angeles')
+        assert self.store.ingest('meter-1', series) == len(series.series)
+
+        start_at, end_at = series.series[10][0], series.series[20][0]
+        out = Series.from_store(self.store, 'meter-1', start_at, end_at)
+        assert out.data() == series.data(start_at, end_at)
+
+    def test_ingest_replaces_existing_readings(self):
+        self.store.ingest('meter-1', [("2013-09-18 00:00:00", 1.0), ("2013-09-18 00:15:00", 2.0)])
+        self.store.ingest('meter-1', [("2013-09-18 00:15:00", 3.0)])
+        times, values = self.store.fetch('meter-1')
+        assert values.tolist() == [1.0, 3.0]
+
+    def test_batched_multi_meter_read(self):
+        self.store.max_meters_per_query = 2
+        for i in range(5):
+            self.store.ingest(i, [(1379487600, float(i)), (1379488500, float(i) + 1)])
+
+        out = self.store.series_many(range(5), start_at=1379488500)
+        assert sorted(out.keys()) == ['0', '1', '2', '3', '4']
+        assert out['3'].data() == [(1379488500, 4.0)]
+        assert self.store.meter_ids() == ['0', '1', '2', '3', '4']
+
+    def test_unknown_meter_is_empty(self):
+        times, values = self.store.fetch('nope')
+        assert len(times) == 0
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
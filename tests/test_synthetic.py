@@ -0,0 +1,126 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from loadshape import Series, calendar_features, synthetic, utils
+
+class TestSynthetic(unittest.TestCase):
+
+    def setUp(self):
+        self.timezone = utils.get_timezone('America/Los_Angeles')
+
+    def test_deterministic(self):
+        a = synthetic.meter("2013-03-01", "2013-03-15", 900, self.timezone, seed=4)
+        b = synthetic.meter("2013-03-01", "2013-03-15", 900, self.timezone, seed=4)
+        c = synthetic.meter("2013-03-01", "2013-03-15", 900, self.timezone, seed=5)
+        assert all(numpy.array_equal(x, y) for x, y in zip(a, b))
+        assert not numpy.array_equal(a[1], c[1])
+
+    def test_chunks_join_up(self):
+        # a start that is not on the 5 minute grid
+        start = utils.read_timestamp("2013-03-01", self.timezone) + 100
+        whole = synthetic.meter(start, "2013-03-20", 300, self.timezone, seed=1)
+        parts = list(synthetic.chunks(start, "2013-03-20", 300, self.timezone,
+                                      seed=1, chunk_days=3))
+        assert len(parts) == 7
+        for i in range(3):
+            assert numpy.array_equal(whole[i], numpy.concatenate([p[i] for p in parts]))
+
+    def test_main_writes_temperatures(self):
+        out_dir = tempfile.mkdtemp()
+        try:
+            synthetic.main(["--meters", "2", "--days", "2", "--start-at", "2013-11-05 00:00:00",
+                            "--out-dir", out_dir])
+            assert sorted(os.listdir(out_dir)) == ["meter-00000.csv", "meter-00001.csv",
+                                                   "temperature.csv"]
+            temps = Series(os.path.join(out_dir, "temperature.csv"), self.timezone)
+            assert len(temps.values()) == 48
+        finally:
+            shutil.rmtree(out_dir)
+
+    def test_weekly_schedule(self):
+        times, kw, temps = synthetic.meter("2013-09-01", "2013-09-29", 900, self.timezone)
+        features = calendar_features.features(times, self.timezone)
+        occupied = features.workday() & (features.hour >= 10) & (features.hour < 17)
+        night = (features.hour < 4)
+        assert kw[occupied].mean() > 1.5 * kw[night].mean()
+
+    def test_dst_days(self):
+        times, kw, temps = synthetic.meter("2013-03-09", "2013-03-12", 3600, self.timezone)
+        days = calendar_features.features(times, self.timezone).days
+        counts = numpy.bincount(days - days.min())
+        assert counts.tolist() == [24, 23, 24, 1]
+
+    def test_messy(self):
+        times, kw, temps = synthetic.meter("2013-03-01", "2013-04-01", 900, self.timezone)
+        messy_times, messy_kw = synthetic.messy(times, kw, seed=2, gaps=0.05,
+                                                duplicates=0.01, out_of_order=0.01)
+        steps = numpy.diff(messy_times)
+        assert (steps == 0).any()
+        assert (steps < 0).any()
+        assert len(numpy.unique(messy_times)) < len(times)
+
+        series = Series(zip(messy_times.tolist(), messy_kw.tolist()), self.timezone)
+        assert (numpy.diff(series.arrays()[0]) >= 0).all()
+
+    def test_write_csv(self):
+        directory = tempfile.mkdtemp()
+        try:
+            times, kw, temps = synthetic.meter("2013-11-05", "2013-11-07", 900, self.timezone)
+            filename = os.path.join(directory, 'kw.csv')
+            synthetic.write_csv(filename, times, kw, self.timezone)
+            series = Series(filename, self.timezone)
+            assert len(series.values()) == len(times)
+            assert numpy.allclose(series.values(), numpy.round(kw, 3))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_meters(self):
+        meters = list(synthetic.meters(3, "2013-03-01", "2013-03-08", 900, self.timezone))
+        assert [m[0] for m in meters] == ['meter-00000', 'meter-00001', 'meter-00002']
+        assert numpy.array_equal(meters[0][3], meters[1][3])
+        assert not numpy.array_equal(meters[0][2], meters[1][2])
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
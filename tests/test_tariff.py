@@ -69,6 +69,15 @@ class TestTariff(unittest.TestCase):
         assert t.rate_structure != None
         assert t.rate_schedule != None
 
+    def test_energy_prices(self):
+        t = Tariff(tariff_file=self.get_test_tariff(), timezone='America/Los_Angeles')
+        # Tuesday 2013-09-17: 8:00 ends an off peak hour, 8:15 is in the
+        # 8AM hour (period 4 in september), 15:00 ends the 2PM peak hour
+        times = [1379430000, 1379430900, 1379455200]
+        assert t.energy_prices(times).tolist() == [0.13768, 0.23713, 0.48657]
+        # Saturday 2013-09-21 at noon
+        assert t.energy_prices([1379790000]).tolist() == [0.13768]
+
 def main():
     unittest.main()
 
@@ -0,0 +1,77 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import unittest
+
+from loadshape import TimeGrid, utils
+
+class TestTimeGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.timezone = utils.get_timezone('America/Los_Angeles')
+
+    def test_between(self):
+        grid = TimeGrid.between(1379487600, 1379487600 + (900 * 5), 900, self.timezone)
+        assert len(grid) == 6
+        assert grid.start_at() == 1379487600
+        assert grid.end_at() == 1379487600 + (900 * 5)
+        assert grid.times().tolist() == range(1379487600, 1379487600 + (900 * 6), 900)
+
+    def test_end_off_the_grid(self):
+        grid = TimeGrid.between(1379487600, 1379487600 + 1000, 900, self.timezone)
+        assert len(grid.data()) == 2
+
+    def test_options(self):
+        grid = TimeGrid(1379487600, 900, 96, self.timezone)
+        options = grid.options()
+        assert "--timeGrid=1379487600,900,96" in options
+        assert "--timeZone=America/Los_Angeles" in options
+
+    def test_value_semantics(self):
+        a = TimeGrid(1379487600, 900, 96, self.timezone)
+        b = TimeGrid(1379487600, 900, 96, self.timezone)
+        assert a == b
+        assert len(set([a, b])) == 1
+        assert a != TimeGrid(1379487600, 900, 95, self.timezone)
+
+    def test_invalid_grid(self):
+        self.assertRaises(Exception, TimeGrid, 1379487600, 0, 10)
+        self.assertRaises(Exception, TimeGrid.between, 1379487600, 1379487000, 900)
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
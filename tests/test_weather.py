@@ -0,0 +1,108 @@
+# --------------------------------------------------
+# Building Energy Baseline Analysis Package
+#
+# Copyright (c) 2013, The Regents of the University of California, Department
+# of Energy contract-operators of the Lawrence Berkeley National Laboratory.
+# All rights reserved.
+# 
+# The Regents of the University of California, through Lawrence Berkeley National
+# Laboratory (subject to receipt of any required approvals from the U.S.
+# Department of Energy). All rights reserved.
+# 
+# If you have questions about your rights to use or distribute this software,
+# please contact Berkeley Lab's Technology Transfer Department at TTD@lbl.gov
+# referring to "Building Energy Baseline Analysis Package (LBNL Ref 2014-011)".
+# 
+# NOTICE: This software was produced by The Regents of the University of
+# California under Contract No. DE-AC02-05CH11231 with the Department of Energy.
+# For 5 years from November 1, 2012, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, and perform
+# publicly and display publicly, by or on behalf of the Government. There is
+# provision for the possible extension of the term of this license. Subsequent to
+# that period or any extension granted, the Government is granted for itself and
+# others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide
+# license in this data to reproduce, prepare derivative works, distribute copies
+# to the public, perform publicly and display publicly, and to permit others to
+# do so. The specific term of the license can be identified by inquiry made to
+# Lawrence Berkeley National Laboratory or DOE. Neither the United States nor the
+# United States Department of Energy, nor any of their employees, makes any
+# warranty, express or implied, or assumes any legal liability or responsibility
+# for the accuracy, completeness, or usefulness of any data, apparatus, product,
+# or process disclosed, or represents that its use would not infringe privately
+# owned rights.
+# --------------------------------------------------
+
+import unittest
+
+from os import path
+from loadshape import Loadshape, Series, weather
+from loadshape.weather import WeatherRegistry
+
+class TestWeather(unittest.TestCase):
+
+    def setUp(self):
+        weather.registry.clear()
+
+    def get_kw_data_filepath(self):
+        test_dir = path.dirname(path.abspath(__file__))
+        return path.join(test_dir, 'data', 'test_kw_small.csv')
+
+    def get_temp_data_filepath(self):
+        test_dir = path.dirname(path.abspath(__file__))
+        return path.join(test_dir, 'data', 'test_temp_small.csv')
+
+    def test_station_is_parsed_once(self):
+        a = weather.register('KOAK', self.get_temp_data_filepath(), timezone='America/Los_Angeles')
+        b = weather.register('KOAK', self.get_temp_data_filepath(), timezone='America/Los_Angeles')
+        assert a is b
+        assert weather.station('KOAK') is a
+
+    def test_interpolation_is_shared_and_aligned(self):
+        registry = WeatherRegistry()
+        registry.register('KOAK', [(1379487600, 50.0), (1379491200, 54.0)],
+                          timezone='America/Los_Angeles')
+        grid = registry.interpolate('KOAK', step_size=900)
+
+        assert grid.data() == [(1379487600, 50.0), (1379488500, 51.0), (1379489400, 52.0),
+                               (1379490300, 53.0), (1379491200, 54.0)]
+        assert registry.interpolate('KOAK', step_size=900) is grid
+        assert registry.write_to_tempfile('KOAK', step_size=900) is \
+               registry.write_to_tempfile('KOAK', step_size=900)
+
+    def test_grid_step_matches_load_spacing(self):
+        registry = WeatherRegistry()
+        assert registry.grid_step(Series([(0, 1), (900, 1), (1800, 1)])) == 900
+        assert registry.grid_step(Series([(0, 1), (600, 1), (1200, 1)])) == 300
+        assert registry.grid_step(Series([(0, 1), (7200, 1), (14400, 1)])) == 3600
+
+    def test_loadshapes_share_station(self):
+        weather.register('KOAK', self.get_temp_data_filepath(), timezone='America/Los_Angeles')
+        a = Loadshape(self.get_kw_data_filepath(), weather_station='KOAK',
+                      timezone='America/Los_Angeles', log_level=40)
+        b = Loadshape(self.get_kw_data_filepath(), weather_station='KOAK',
+                      timezone='America/Los_Angeles', log_level=40)
+
+        assert a.training_temperature_series is b.training_temperature_series
+        assert a._temperature_tempfile() is b._temperature_tempfile()
+
+    def test_replaced_station_keeps_loadshape_temperatures(self):
+        weather.register('KOAK', self.get_temp_data_filepath(), timezone='America/Los_Angeles')
+        l = Loadshape(self.get_kw_data_filepath(), weather_station='KOAK',
+                      timezone='America/Los_Angeles', log_level=40)
+        before = open(l._temperature_tempfile().name).read()
+
+        weather.register('KOAK', [(1379487600, 50.0), (1379491200, 54.0)],
+                         timezone='America/Los_Angeles', replace=True)
+        tmp_file = l._temperature_tempfile()
+        assert tmp_file is not weather.registry.write_to_tempfile('KOAK', step_size=900)
+        assert open(tmp_file.name).read() == before
+
+    def test_unknown_station(self):
+        self.assertRaises(Exception, weather.station, 'nope')
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()